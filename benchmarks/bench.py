@@ -0,0 +1,150 @@
+""" Throughput benchmarks of the integrator, the fitness and full PSO iterations
+
+Usage:
+    python benchmarks/bench.py [--quick] [--output bench.json] [--compare baseline.json]
+
+Results are emitted as JSON so that runs of different releases can be compared.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import nisi
+from nisi import PSO
+from systems import SYSTEMS, build
+
+
+def rate(func, count, min_time):
+    """ Calls of ``func`` per second (each call doing ``count`` units of work) """
+    func()
+    calls, start = 0, time.perf_counter()
+    while True:
+        func()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return calls * count / elapsed
+
+
+def bench_ode45(name, system, horizons, min_time):
+    for n in horizons:
+        f_fit, _ = build(system, n=n)
+        f_fit.unknown_const = np.array(system.true_const)
+        value = rate(lambda: f_fit.ode45(f_fit.model, f_fit.t, f_fit.x0), n - 1, min_time)
+        yield {'system': name, 'benchmark': 'ode45', 'n': n, 'value': value, 'unit': 'steps/s'}
+
+
+def bench_evaluate(name, system, horizons, swarms, min_time):
+    for n in horizons:
+        f_fit, p = build(system, n=n)
+        rng = np.random.default_rng(0)
+        low, up = np.array(p['optmizer']['lowBound']), np.array(p['optmizer']['upBound'])
+        k = low + (up - low) * rng.random(len(low))
+        value = rate(lambda: f_fit.evaluate(k), 1, min_time)
+        yield {'system': name, 'benchmark': 'evaluate', 'n': n, 'value': value, 'unit': 'calls/s'}
+        for nPop in swarms:
+            k = low + (up - low) * rng.random((nPop, len(low)))
+            value = rate(lambda: f_fit.evaluate_batch(k), nPop, min_time)
+            yield {'system': name, 'benchmark': 'evaluate_batch', 'n': n, 'nPop': nPop,
+                   'value': value, 'unit': 'calls/s'}
+
+
+def bench_precision(name, system, horizons, swarms, min_time):
+    """ float32 screening throughput, with its largest relative loss error against float64 """
+    for n in horizons:
+        f64, p = build(system, n=n)
+        f32, _ = build(system, n=n, dtype='float32')
+        f32.y = f64.y
+        rng = np.random.default_rng(0)
+        low, up = np.array(p['optmizer']['lowBound']), np.array(p['optmizer']['upBound'])
+        for nPop in swarms:
+            k = low + (up - low) * rng.random((nPop, len(low)))
+            exact = f64.evaluate_batch(k)[0]
+            error = np.max(np.abs(f32.evaluate_batch(k)[0] - exact) / np.abs(exact))
+            value = rate(lambda: f32.evaluate_batch(k), nPop, min_time)
+            yield {'system': name, 'benchmark': 'evaluate_batch_float32', 'n': n, 'nPop': nPop,
+                   'value': value, 'unit': 'calls/s', 'relative_error': float(error)}
+
+
+def bench_run(name, system, horizons, swarms, min_time):
+    for n in horizons:
+        for nPop in swarms:
+            f_fit, p = build(system, nPop, n)
+            pso = PSO(f_fit, p)
+            value = rate(pso.run, 1, min_time)
+            pso.close()
+            yield {'system': name, 'benchmark': 'run', 'n': n, 'nPop': nPop,
+                   'value': value, 'unit': 'iterations/s'}
+
+
+def compare(results, baseline, tolerance):
+    """ Cases of ``results`` slower than ``baseline`` by more than ``tolerance`` """
+    def key(r):
+        return r['system'], r['benchmark'], r['n'], r.get('nPop')
+    reference = {key(r): r['value'] for r in baseline['results']}
+    slower = []
+    for r in results:
+        if key(r) in reference and r['value'] < (1 - tolerance) * reference[key(r)]:
+            slower.append(dict(r, baseline=reference[key(r)]))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help='small sizes, for smoke testing')
+    parser.add_argument('--systems', nargs='+', default=list(SYSTEMS), choices=list(SYSTEMS))
+    parser.add_argument('--min-time', type=float, default=1.0,
+                        help='minimal measuring time per case, in seconds')
+    parser.add_argument('--output', help='JSON file (default: stdout)')
+    parser.add_argument('--compare', help='JSON report of a previous run; exit 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='allowed relative slowdown against --compare')
+    args = parser.parse_args(argv)
+
+    horizons = [200] if args.quick else [500, 2000]
+    swarms = [10] if args.quick else [10, 100, 500]
+    min_time = 0.05 if args.quick else args.min_time
+    results = []
+    for name in args.systems:
+        system = SYSTEMS[name]
+        for bench in (bench_ode45(name, system, horizons, min_time),
+                      bench_evaluate(name, system, horizons, swarms, min_time),
+                      bench_precision(name, system, horizons, swarms, min_time),
+                      bench_run(name, system, horizons, swarms, min_time)):
+            for result in bench:
+                print(json.dumps(result), file=sys.stderr)
+                results.append(result)
+
+    report = {'nisi': nisi.__version__,
+              'numpy': np.__version__,
+              'python': platform.python_version(),
+              'machine': platform.machine(),
+              'processor': platform.processor(),
+              'cpu_count': os.cpu_count(),
+              'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=1)
+    else:
+        json.dump(report, sys.stdout, indent=1)
+
+    if args.compare:
+        with open(args.compare) as f:
+            slower = compare(results, json.load(f), args.tolerance)
+        for r in slower:
+            print(f"regression: {r['system']} {r['benchmark']} n={r['n']} nPop={r.get('nPop')}: "
+                  f"{r['value']:.4g} < {r['baseline']:.4g} {r['unit']}", file=sys.stderr)
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+""" Dynamic systems of examples/ used by the benchmarks """
+import numpy as np
+from nisi import Model
+
+
+class Duffing(Model):
+    vectorized = True
+    inplace = True
+    true_const = [1., 0.385]
+
+    def model(self, t, y, *args, out=None):
+        k = self.unknown_const
+        alpha = 0.5
+        beta  = 1
+        delta = -1
+        omega = k[..., 0]
+        F     = k[..., 1]
+        # non-ideal coeff
+        a_0 = 2.0
+        b_0 = 0.01
+        c_0 = 0.0
+
+        dy = np.zeros(np.shape(y)) if out is None else out
+        dy[..., 0] = y[..., 1]
+        dy[..., 1] = -alpha*y[..., 1] -delta*y[..., 0] -beta*y[..., 0]**3 + F*np.cos(y[..., 2]  + a_0*np.sin(b_0*y[..., 2]+c_0))
+        dy[..., 2] = omega
+        return dy
+
+
+class ModifiedOscillator2(Model):
+    vectorized = True
+    inplace = True
+    true_const = [2.5, 5.1]
+
+    def model(self, t, y, *args, out=None):
+        k = self.unknown_const
+        ks   = k[..., 0]
+        c    = k[..., 1]
+        w    = 0.5
+        m    = 1
+        wn   = np.sqrt(ks/m)
+        zeta = c/(2*m*wn)
+        dy = np.zeros(np.shape(y)) if out is None else out
+        dy[..., 0] = y[..., 1]
+        dy[..., 1] = -2 * zeta * wn * np.where(abs(y[..., 1]) > 0.1, 5.0, 0.5)*y[..., 1] - wn ** 2 * y[..., 0] + 4*np.sin(2*np.pi*w*t)
+        return dy
+
+
+class ModifiedOscillator3(Model):
+    vectorized = True
+    inplace = True
+    true_const = [2.5, 5.1, 0.54]
+
+    def model(self, t, y, *args, out=None):
+        k = self.unknown_const
+        ks   = k[..., 0]
+        c    = k[..., 1]
+        w    = k[..., 2]
+        m    = 1
+        wn   = np.sqrt(ks/m)
+        zeta = c/(2*m*wn)
+        dy = np.zeros(np.shape(y)) if out is None else out
+        dy[..., 0] = y[..., 1]
+        dy[..., 1] = -2 * zeta * wn * np.where(abs(y[..., 1]) > 0.1, 5.0, 0.5)*y[..., 1] - wn ** 2 * y[..., 0] + 4*np.sin(2*np.pi*w*t)
+        return dy
+
+
+def params(system, nPop=10, n=None):
+    """ Parameters of the matching example, with swarm size and grid length overridden """
+    if system is Duffing:
+        optmizer = {'lowBound': [0.1, 0.1], 'upBound': [5.0, 0.5],
+                    'maxVelocity': 2, 'minVelocity': -2, 'cognitive_weight': 1.0,
+                    'escape_min_vel_percent': 0.0005, 'escape_min_error': 2e-3}
+        dyn_system = {'state_mask': [True, False, False], 'x0': [0., 0., 0.], 't': [0, 50, 500]}
+    elif system is ModifiedOscillator2:
+        optmizer = {'lowBound': [1.0, 1.0], 'upBound': [8, 8],
+                    'maxVelocity': 5, 'minVelocity': -5, 'cognitive_weight': 2.0,
+                    'escape_min_vel_percent': 0.0005, 'escape_min_error': 0.5}
+        dyn_system = {'state_mask': [True, True], 'x0': [0., 0.], 't': [0, 6, 1000]}
+    else:
+        optmizer = {'lowBound': [1.0, 1.0, 0.1], 'upBound': [8, 8, 5],
+                    'maxVelocity': 5, 'minVelocity': -5, 'cognitive_weight': 2.0,
+                    'escape_min_vel_percent': 0.0005, 'escape_min_error': 0.001}
+        dyn_system = {'state_mask': [True, False], 'x0': [0., 0.], 't': [0, 6, 1000]}
+    optmizer.update({'nPop': nPop, 'nVar': len(system.true_const), 'social_weight': 2.0,
+                     'w': 0.9, 'beta': 0.1, 'w_damping': 0.999, 'seed': 0})
+    dyn_system.update({'model_path': '', 'external': None, 'loss': 'rmse'})
+    if n is not None:
+        dyn_system['t'] = [dyn_system['t'][0], dyn_system['t'][1] * n / dyn_system['t'][2], n]
+    return {'optmizer': optmizer, 'dyn_system': dyn_system}
+
+
+def build(system, nPop=10, n=None, dtype='float64'):
+    """ Model with observed data simulated from the true constants, and its params """
+    p = params(system, nPop, n)
+    p['dyn_system']['dtype'] = dtype
+    f_fit = system(p)
+    f_fit.y = f_fit.simulation(np.array(system.true_const))
+    return f_fit, p
+
+
+SYSTEMS = {'duffing': Duffing,
+           'modified_oscillator_2': ModifiedOscillator2,
+           'modified_oscillator_3': ModifiedOscillator3}
@@ -2,6 +2,14 @@
 
 from .core.pso import Particle
 from .core.pso import PSO
+from .core.islands import IslandModel
 from .core.model import Model
+from .core.equations import EquationModel
+from .core.experiments import MultiExperiment
+from .core.shooting import MultipleShooting
+from .core.sweep import Sweep
+from .core.observers import Observer
+from .core.observers import JsonlEventSink
+from .core.monitor import LiveMonitor
 
 __version__ = '1.0.0'
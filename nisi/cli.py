@@ -0,0 +1,264 @@
+""" Batch runner of identification jobs
+
+Usage:
+    nisi run CONFIG_OR_DIR_OR_MANIFEST... [--results results/] [--workers N]
+             [--max-time S] [--max-evaluations N] [--force]
+    nisi summary [--results results/]
+
+A job config (JSON, or YAML when PyYAML is installed) holds the ``params``
+of ``PSO``/``Model``, the model class and the ``optimize`` budget::
+
+    {"name": "duffing-01",
+     "model": "models.py:EqSystem",           # or "package.module:Class"
+     "params": {"optmizer": {...},
+                "dyn_system": {"model_path": "recording.npy", ...}},
+     "budget": {"max_iterations": 500, "max_time": 600, "stagnation": 100}}
+
+Without "model", ``EquationModel`` is used (``dyn_system['equations']``).
+Relative paths are resolved against the config file. A manifest is a config
+file with a "jobs" list of config paths or inline configs.
+
+Results are appended to ``results.jsonl`` in the results directory, one line
+per job; jobs already completed with the same config, data file and model file
+are skipped on rerun.
+"""
+import argparse
+import copy
+import hashlib
+import importlib
+import importlib.util
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .core.equations import EquationModel
+from .core.pso import PSO
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+CONFIG_EXTENSIONS = ('.json', '.yaml', '.yml')
+
+
+class JobError(Exception):
+    pass
+
+
+def read_config(path):
+    with open(path, encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            if yaml is None:
+                raise JobError(f'PyYAML is required to read {path}')
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def _resolve(path, base):
+    return path if not path or os.path.isabs(path) else os.path.join(base, path)
+
+
+def _stamp(path):
+    """Size and modification time of ``path``, None if it does not exist."""
+    if not path or not os.path.isfile(path):
+        return None
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _job(config, path, base):
+    """Job dict with its name, config, base directory and hash of its inputs."""
+    config = copy.deepcopy(config)
+    config.setdefault('name', os.path.splitext(os.path.basename(path))[0])
+    model_path = config.get('params', {}).get('dyn_system', {}).get('model_path', '')
+    module = (config.get('model') or '').rsplit(':', 1)[0]
+    model_file = module if module.endswith('.py') else ''
+    inputs = {'config': config, 'data': _stamp(_resolve(model_path, base)),
+              'model': _stamp(_resolve(model_file, base))}
+    digest = hashlib.sha1(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+    return {'name': config['name'], 'config': config, 'base': base, 'hash': digest}
+
+
+def collect_jobs(sources):
+    """Jobs of config files, directories of config files and manifests."""
+    jobs = []
+    for source in sources:
+        if os.path.isdir(source):
+            paths = [os.path.join(source, p) for p in sorted(os.listdir(source))
+                     if p.endswith(CONFIG_EXTENSIONS)]
+            jobs += collect_jobs(paths)
+            continue
+        config = read_config(source)
+        base = os.path.dirname(os.path.abspath(source))
+        if 'jobs' not in config:
+            jobs.append(_job(config, source, base))
+            continue
+        for entry in config['jobs']:
+            if isinstance(entry, dict):
+                jobs.append(_job(entry, source, base))
+            else:
+                jobs += collect_jobs([_resolve(entry, base)])
+    names = [job['name'] for job in jobs]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise JobError(f'Duplicated job names: {", ".join(duplicates)}')
+    return jobs
+
+
+def load_model(spec, base):
+    """Model class of ``"file.py:Class"`` or ``"package.module:Class"``."""
+    if spec is None:
+        return EquationModel
+    module_name, class_name = spec.rsplit(':', 1)
+    if module_name.endswith('.py'):
+        filename = _resolve(module_name, base)
+        name = 'nisi_job_' + hashlib.sha1(os.path.abspath(filename).encode()).hexdigest()[:12]
+        module_spec = importlib.util.spec_from_file_location(name, filename)
+        module = importlib.util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(module)
+    else:
+        module = importlib.import_module(module_name)
+    return getattr(module, class_name)
+
+
+def _params(job):
+    params = copy.deepcopy(job['config']['params'])
+    dyn_system = params['dyn_system']
+    dyn_system['model_path'] = _resolve(dyn_system.get('model_path', ''), job['base'])
+    dyn_system.setdefault('external', None)
+    return params
+
+
+def _budget(job, limits):
+    budget = dict(job['config'].get('budget', {}))
+    for key, value in (limits or {}).items():
+        # command line budgets cap the per-job ones
+        budget[key] = min(budget.get(key, value), value)
+    return budget
+
+
+def run_job(job, budget=None):
+    """Run one job in this process and return its result record."""
+    start = time.perf_counter()
+    record = {'name': job['name'], 'hash': job['hash']}
+    try:
+        params = _params(job)
+        f_fit = load_model(job['config'].get('model'), job['base'])(params)
+        pso = PSO(f_fit, params)
+        setup = time.perf_counter() - start
+        try:
+            result = pso.optimize(**_budget(job, budget))
+        finally:
+            pso.close()
+        record.update(status='completed', position=result.position.tolist(),
+                      cost=result.cost, reason=result.reason, iterations=result.iterations,
+                      evaluations=result.evaluations, time_setup=setup,
+                      time_optimize=result.time, history=result.history)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        record.update(status='failed', error=f'{type(e).__name__}: {e}')
+    record['time'] = time.perf_counter() - start
+    return record
+
+
+class ResultStore:
+    """
+    Append-only JSON-lines store of job records in ``path/results.jsonl``;
+    the last record of a job wins.
+    """
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.filename = os.path.join(path, 'results.jsonl')
+
+    def records(self):
+        records = {}
+        if os.path.exists(self.filename):
+            with open(self.filename, encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        records[record['name']] = record
+        return records
+
+    def completed(self, job, records=None):
+        record = (self.records() if records is None else records).get(job['name'])
+        return record is not None and record['status'] == 'completed' and \
+            record['hash'] == job['hash']
+
+    def add(self, record):
+        with open(self.filename, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+
+
+def _describe(record):
+    if record['status'] != 'completed':
+        return f"{record['name']}: failed {record['error']}"
+    return (f"{record['name']}: cost={record['cost']:.6g} ({record['reason']}, "
+            f"{record['evaluations']} evaluations, {record['time']:.1f} s)")
+
+
+def run(sources, results='results', workers=None, budget=None, force=False):
+    """
+    Run the pending jobs of ``sources`` on ``workers`` processes; returns their
+    records. Progress is printed to stderr.
+    """
+    store = ResultStore(results)
+    records = store.records()
+    jobs = [job for job in collect_jobs(sources) if force or not store.completed(job, records)]
+    print(f'{len(jobs)} job(s) to run', file=sys.stderr)
+    done = []
+    with ProcessPoolExecutor(workers) as pool:
+        futures = {pool.submit(run_job, job, budget): job for job in jobs}
+        for future in as_completed(futures):
+            record = future.result()
+            store.add(record)
+            done.append(record)
+            print(_describe(record), file=sys.stderr)
+    return done
+
+
+def summary(results='results', out=None):
+    out = out or sys.stdout
+    for name, record in sorted(ResultStore(results).records().items()):
+        if record['status'] == 'completed':
+            position = np.array2string(np.array(record['position']), precision=6)
+            print(f"{name}\t{record['cost']:.6g}\t{position}\t{record['reason']}", file=out)
+        else:
+            print(f"{name}\tfailed\t{record['error']}", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='nisi', description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='run identification jobs')
+    run_parser.add_argument('sources', nargs='+',
+                            help='job configs, directories of configs or manifests')
+    run_parser.add_argument('--results', default='results', help='results directory')
+    run_parser.add_argument('--workers', type=int, help='parallel jobs (default: CPU count)')
+    run_parser.add_argument('--max-time', type=float, help='wall-clock budget per job, in seconds')
+    run_parser.add_argument('--max-evaluations', type=int, help='evaluation budget per job')
+    run_parser.add_argument('--force', action='store_true', help='rerun completed jobs')
+    summary_parser = commands.add_parser('summary', help='print the stored results')
+    summary_parser.add_argument('--results', default='results', help='results directory')
+    args = parser.parse_args(argv)
+
+    if args.command == 'summary':
+        summary(args.results)
+        return
+    budget = {}
+    if args.max_time is not None:
+        budget['max_time'] = args.max_time
+    if args.max_evaluations is not None:
+        budget['max_evaluations'] = args.max_evaluations
+    records = run(args.sources, args.results, args.workers, budget, args.force)
+    if any(record['status'] == 'failed' for record in records):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+
+class EvaluationCache:
+    """
+    LRU cache of fitness costs keyed on the parameter vector quantized to
+    ``tol``. With a ``path`` the cache is loaded from, and saved to, an
+    ``.npz`` file; entries are only reused when the stored ``fingerprint``
+    (see ``Model.fingerprint``) matches, i.e. for the same dataset.
+    """
+    def __init__(self, tol=1e-8, maxsize=100000, path=None, fingerprint=''):
+        self.tol = tol
+        self.maxsize = maxsize
+        self.path = path
+        self.fingerprint = fingerprint
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        return len(self._data)
+
+    def key(self, k):
+        return np.round(np.asarray(k, dtype=float) / self.tol).astype(np.int64).tobytes()
+
+    def get(self, k):
+        key = self.key(k)
+        cost = self._data.get(key)
+        if cost is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return cost
+
+    def put(self, k, cost):
+        key = self.key(k)
+        self._data[key] = float(cost)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def entries(self):
+        """Quantized keys (n, nVar) and costs (n,), least recently used first."""
+        keys = np.frombuffer(b''.join(self._data), dtype=np.int64)
+        keys = keys.reshape(len(self._data), -1) if self._data else keys.reshape(0, 0)
+        return keys, np.fromiter(self._data.values(), dtype=float, count=len(self._data))
+
+    def restore(self, keys, cost):
+        """Replace the entries by those returned by ``entries``."""
+        self._data = OrderedDict((key.tobytes(), float(c)) for key, c in zip(keys, cost))
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def save(self, path=None):
+        path = path or self.path
+        keys, cost = self.entries()
+        with open(path, 'wb') as f:
+            np.savez(f, keys=keys, cost=cost, tol=self.tol, fingerprint=self.fingerprint)
+
+    def load(self, path):
+        with np.load(path) as data:
+            if data['tol'] != self.tol or str(data['fingerprint']) != self.fingerprint:
+                return
+            for key, cost in zip(data['keys'], data['cost']):
+                self._data[key.tobytes()] = float(cost)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
@@ -0,0 +1,123 @@
+import itertools
+import os
+
+import numpy as np
+
+
+class ObservedData:
+    """
+    Observed states read from a recording and resampled on the integration
+    grid. Configured by the ``model_path`` (the recording) and ``external``
+    (the options below) keys of ``dyn_system``.
+
+    format: 'npy' (memory-mapped), 'raw' (memory-mapped binary of ``dtype``
+        with ``columns`` columns) or 'csv' (streamed in chunks); by default
+        guessed from the file extension (.npy, .csv/.txt, anything else raw).
+    time_column: column holding the sample times. Without it, samples are
+        taken ``dt`` apart starting at ``t0`` (default: the recording spans
+        the integration grid exactly).
+    state_columns: recording column of each state (None when not recorded);
+        by default the non-time columns in state order.
+    chunksize: rows read at a time.
+
+    Only the time column and the columns of the ``state_mask`` states are
+    ever read, chunk by chunk, and linearly interpolated on the grid.
+    """
+    def __init__(self, path, state_mask, format=None, dtype='float64', columns=None,
+                 time_column=None, state_columns=None, dt=None, t0=None,
+                 chunksize=1 << 16, delimiter=',', skiprows=0):
+        self.path = path
+        self.state_mask = np.asarray(state_mask, dtype=bool)
+        if format is None:
+            ext = os.path.splitext(path)[1].lower()
+            format = {'.npy': 'npy', '.csv': 'csv', '.txt': 'csv'}.get(ext, 'raw')
+        self.format = format
+        if self.format not in ('npy', 'raw', 'csv'):
+            raise ValueError(f'Unknown data format: {self.format}')
+        self.dtype = dtype
+        self.columns = columns
+        self.time_column = time_column
+        if state_columns is None:
+            state_columns = [c if time_column is None or c < time_column else c + 1
+                             for c in range(len(self.state_mask))]
+        self.state_columns = state_columns
+        self.dt = dt
+        self.t0 = t0
+        self.chunksize = chunksize
+        self.delimiter = delimiter
+        self.skiprows = skiprows
+
+    def _usecols(self):
+        observed = [self.state_columns[i] for i in np.flatnonzero(self.state_mask)]
+        if any(c is None for c in observed):
+            raise ValueError('state_mask selects a state that is not recorded')
+        if self.time_column is None:
+            return observed
+        return [self.time_column] + observed
+
+    def _open(self):
+        if self.format == 'npy':
+            return np.load(self.path, mmap_mode='r')
+        if self.columns is None:
+            raise ValueError("raw recordings need the number of 'columns'")
+        return np.memmap(self.path, dtype=self.dtype, mode='r').reshape(-1, self.columns)
+
+    def _chunks(self):
+        """Rows of the used columns, ``chunksize`` at a time."""
+        usecols = self._usecols()
+        if self.format == 'csv':
+            with open(self.path) as f:
+                lines = itertools.islice(f, self.skiprows, None)
+                while True:
+                    chunk = list(itertools.islice(lines, self.chunksize))
+                    if not chunk:
+                        return
+                    yield np.loadtxt(chunk, delimiter=self.delimiter, usecols=usecols,
+                                     ndmin=2, dtype=float)
+        else:
+            recording = self._open()
+            for start in range(0, len(recording), self.chunksize):
+                yield np.asarray(recording[start:start + self.chunksize][:, usecols], dtype=float)
+
+    def _sample_period(self, t):
+        if self.dt is not None:
+            return self.dt
+        if self.format == 'csv':
+            raise ValueError("csv recordings without 'time_column' need 'dt'")
+        return (t[-1] - t[0]) / (len(self._open()) - 1)
+
+    def resample(self, t):
+        """
+        Observed states on the grid ``t``: an array (len(t), nState) whose
+        unobserved columns are NaN.
+        """
+        t = np.ravel(t)
+        y = np.full((len(t), len(self.state_mask)), np.nan)
+        observed = np.flatnonzero(self.state_mask)
+        if self.time_column is None:
+            dt = self._sample_period(t)
+            t0 = t[0] if self.t0 is None else self.t0
+        j, row = 0, 0
+        prev = None
+        for chunk in self._chunks():
+            if self.time_column is None:
+                times = t0 + dt * np.arange(row, row + len(chunk))
+                values = chunk
+            else:
+                times, values = chunk[:, 0], chunk[:, 1:]
+            row += len(chunk)
+            if prev is not None:
+                # carry the last sample over so that grid points between
+                # two chunks are interpolated as well
+                times = np.concatenate([prev[0], times])
+                values = np.concatenate([prev[1], values])
+            hi = np.searchsorted(t, times[-1], side='right')
+            for c, state in enumerate(observed):
+                y[j:hi, state] = np.interp(t[j:hi], times, values[:, c])
+            j = hi
+            prev = times[-1:], values[-1:]
+        if prev is None:
+            raise ValueError(f'Empty recording: {self.path}')
+        # grid points past the recording hold the last sample
+        y[j:, observed] = prev[1]
+        return y
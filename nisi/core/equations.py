@@ -0,0 +1,192 @@
+import ast
+import copy
+import hashlib
+import json
+
+import numpy as np
+
+from .model import Model
+
+# functions and constants usable in equations
+FUNCTIONS = {name: getattr(np, name) for name in
+             ('sin', 'cos', 'tan', 'arcsin', 'arccos', 'arctan', 'arctan2', 'sinh', 'cosh',
+              'tanh', 'exp', 'log', 'sqrt', 'abs', 'sign', 'where', 'minimum', 'maximum', 'pi')}
+
+_RESERVED = ('y', 'k', 'out', '_p')
+
+_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.Call, ast.Name, ast.Load,
+          ast.Constant, ast.operator, ast.unaryop, ast.cmpop)
+
+# compiled (prepare, kernel) pairs by generated source, shared by every model
+# of a process; workers recompile a spec at most once
+_compiled = {}
+
+
+def _value(node):
+    return node.value if isinstance(node, ast.Constant) else None
+
+
+class _Inline(ast.NodeTransformer):
+    """Substitutes the constants and folds the arithmetic they make trivial."""
+    def __init__(self, constants):
+        self.constants = constants
+
+    def visit_Name(self, node):
+        if node.id in self.constants:
+            return ast.copy_location(ast.Constant(float(self.constants[node.id])), node)
+        return node
+
+    def _fold(self, node):
+        value = eval(compile(ast.fix_missing_locations(ast.Expression(node)), '', 'eval'))
+        return ast.copy_location(ast.Constant(value), node)
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.operand, ast.Constant):
+            return self._fold(node)
+        return node
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        left, right = _value(node.left), _value(node.right)
+        if left is not None and right is not None:
+            return self._fold(node)
+        if isinstance(node.op, ast.Mult):
+            if left == 1:
+                return node.right
+            if right == 1:
+                return node.left
+        if isinstance(node.op, (ast.Add, ast.Sub)) and right == 0:
+            return node.left
+        if isinstance(node.op, ast.Add) and left == 0:
+            return node.right
+        if isinstance(node.op, ast.Sub) and right is not None and right < 0:
+            node.op, node.right = ast.Add(), ast.copy_location(ast.Constant(-right), node.right)
+        return node
+
+
+def _parse(expr, known):
+    tree = ast.parse(str(expr), mode='eval')
+    names = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, _NODES):
+            raise ValueError(f'Unsupported syntax in equation: {expr}')
+        if isinstance(node, ast.Call) and not isinstance(node.func, ast.Name):
+            raise ValueError(f'Unsupported call in equation: {expr}')
+        if isinstance(node, ast.Name):
+            if node.id not in known:
+                raise ValueError(f'Unknown name {node.id!r} in equation: {expr}')
+            names.add(node.id)
+    return tree, names
+
+
+def compile_equations(spec):
+    """
+    Compile an equation spec into ``(prepare, kernel)``.
+
+    ``prepare(k)`` evaluates everything that only depends on the unknowns
+    and constants; ``kernel(t, y, prepared, out, *args)`` writes the state
+    derivatives into ``out``. Both work on a single state or a batch.
+    """
+    states = list(spec['states'])
+    unknowns = list(spec.get('unknowns', ()))
+    constants = dict(spec.get('constants', {}))
+    arg_names = list(spec.get('args', ()))
+    definitions = dict(spec.get('definitions', {}))
+    rhs = spec['rhs']
+    if isinstance(rhs, dict):
+        rhs = [rhs[s] for s in states]
+    if len(rhs) != len(states):
+        raise ValueError('One equation per state is required')
+    user = states + unknowns + list(constants) + arg_names + list(definitions)
+    for name in user:
+        if name in _RESERVED or name in FUNCTIONS or name == 't':
+            raise ValueError(f'Reserved name in equations: {name!r}')
+
+    inline = _Inline(constants)
+    known = set(FUNCTIONS) | set(user) | {'t'}
+    invariant = set(unknowns) | set(constants)
+    prepare, kernel = [], []
+    for name, expr in definitions.items():
+        tree, names = _parse(expr, known)
+        code = f'{name} = {ast.unparse(inline.visit(tree).body)}'
+        if names <= invariant | set(FUNCTIONS):
+            invariant.add(name)
+            prepare.append(code)
+        else:
+            kernel.append(code)
+    hoisted = unknowns + [n for n in definitions if n in invariant]
+    for i, expr in enumerate(rhs):
+        tree, _ = _parse(expr, known)
+        kernel.append(f'out[..., {i}] = {ast.unparse(inline.visit(tree).body)}')
+
+    lines = ['def prepare(k):']
+    lines += [f'    {name} = k[..., {i}]' for i, name in enumerate(unknowns)]
+    lines += [f'    {code}' for code in prepare]
+    lines += [f'    return ({"".join(n + ", " for n in hoisted)})']
+    lines += [f'def kernel(t, y, _p, out{"".join(", " + a for a in arg_names)}):']
+    lines += [f'    ({"".join(n + ", " for n in hoisted)}) = _p']
+    lines += [f'    {name} = y[..., {i}]' for i, name in enumerate(states)]
+    lines += [f'    {code}' for code in kernel]
+    lines += ['    return out']
+    source = '\n'.join(lines)
+
+    if source not in _compiled:
+        namespace = dict(FUNCTIONS)
+        exec(compile(source, '<nisi equations>', 'exec'), namespace)
+        _compiled[source] = namespace['prepare'], namespace['kernel']
+    return _compiled[source]
+
+
+class EquationModel(Model):
+    """
+    Model declared by the ``equations`` entry of ``dyn_system`` instead of a
+    hand-written ``model()``::
+
+        'equations': {'states': ['x', 'v', 'phi'],
+                      'unknowns': ['omega', 'F'],
+                      'constants': {'alpha': 0.5, 'beta': 1., 'delta': -1.},
+                      'definitions': {'a': '-alpha*v - delta*x - beta*x**3'},
+                      'rhs': {'x': 'v', 'v': 'a + F*cos(phi)', 'phi': 'omega'}}
+
+    Expressions use the names above, the time ``t``, the experiment
+    ``args`` names and numpy functions (sin, cos, exp, sqrt, where...).
+    The spec is compiled once into a vectorized, in-place kernel; terms
+    depending only on unknowns and constants are evaluated once per
+    ``unknown_const`` instead of at every derivative call.
+    """
+    vectorized = True
+    inplace = True
+
+    def parameters_initializer(self):
+        super().parameters_initializer()
+        # the kernel is compiled from this copy, later edits to params do not apply
+        self.equations = copy.deepcopy(self._params['equations'])
+        self._prepare, self._kernel = compile_equations(self.equations)
+        self._prepared = ()
+
+    @Model.unknown_const.setter
+    def unknown_const(self, value):
+        self._unknown_const = value
+        if value is not None:
+            self._prepared = self._prepare(np.asarray(value))
+
+    def fingerprint(self):
+        """``Model.fingerprint`` that also tells apart different ``equations``."""
+        h = hashlib.sha1(super().fingerprint().encode())
+        h.update(json.dumps(self.equations, sort_keys=True, default=str).encode())
+        return h.hexdigest()
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        del state['_prepare'], state['_kernel']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._prepare, self._kernel = compile_equations(self.equations)
+
+    def model(self, t, y, *args, out=None):
+        if out is None:
+            out = np.empty(np.shape(y))
+        return self._kernel(t, y, self._prepared, out, *args)
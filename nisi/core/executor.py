@@ -0,0 +1,109 @@
+import copy
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+_worker = threading.local()
+
+
+def _init_worker(fitness, private):
+    # Each worker keeps its own fitness object: processes receive it pickled
+    # once through the pool initializer, threads take a private copy so that
+    # ``unknown_const`` is never shared between concurrent evaluations.
+    _worker.fitness = copy.deepcopy(fitness) if private else fitness
+
+
+def _evaluate_worker(chunk):
+    return evaluate_population(_worker.fitness, *chunk)
+
+
+def final_state(fitness, y_hat):
+    """
+    Last state of a full trajectory ``y_hat`` of ``fitness``, or None when
+    ``y_hat`` is not one (sparse output, screening grid, several experiments)
+    or diverged.
+    """
+    if getattr(fitness, 'sparse_output', False) or not isinstance(y_hat, np.ndarray) \
+            or y_hat.ndim != 2 or len(y_hat) != len(getattr(fitness, 't', ())):
+        return None
+    state = np.array(y_hat[-1])
+    return state if np.isfinite(state).all() else None
+
+
+def evaluate_population(fitness, positions, threshold=None, level=None, final_only=False):
+    """
+    Cost (n, 1) and predicted trajectories of ``positions`` (n, nVar), plus
+    the number of time steps skipped by early abandoning. Vectorized models
+    integrate all of them in one pass. ``level`` selects a screening grid.
+    With ``final_only`` only the final state of each trajectory is returned.
+    """
+    if getattr(fitness, 'vectorized', False):
+        cost, _, y_hat = fitness.evaluate_batch(positions, threshold, level)
+        if final_only:
+            y_hat = [final_state(fitness, y) for y in y_hat]
+        elif getattr(fitness, 'inplace', False):
+            # the batch is a view of the buffer reused by the next chunk
+            y_hat = np.array(y_hat)
+        return (np.reshape(cost, (len(positions), 1)), list(y_hat),
+                getattr(fitness, 'aborted_steps', 0))
+    cost = np.empty([len(positions), 1])
+    y_hat = []
+    aborted_steps = 0
+    for i in range(len(positions)):
+        cost[i], _, y = fitness.evaluate(positions[i, :],
+                                         None if threshold is None else threshold[i], level)
+        aborted_steps += getattr(fitness, 'aborted_steps', 0)
+        if final_only:
+            y_hat.append(final_state(fitness, y))
+        else:
+            # in-place models hand back their reusable trajectory buffer
+            y_hat.append(np.array(y) if getattr(fitness, 'inplace', False) else y)
+    return cost, y_hat, aborted_steps
+
+
+class Executor:
+    """
+    Spreads population evaluations over a pool of workers.
+
+    kind: 'serial', 'thread' or 'process'. Positions are split in contiguous
+    chunks and results are gathered in submission order, so the outcome does
+    not depend on which worker finishes first. Process workers only send
+    back the final state of each trajectory (``trajectories`` is False), so
+    that full trajectories are not pickled between processes.
+    """
+    def __init__(self, fitness, kind='serial', n_workers=None):
+        if kind not in ('serial', 'thread', 'process'):
+            raise ValueError(f'Unknown executor: {kind}')
+        self.fitness = fitness
+        self.kind = kind
+        self.trajectories = kind != 'process'
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self._pool = None
+        if kind == 'thread':
+            self._pool = ThreadPoolExecutor(self.n_workers, initializer=_init_worker,
+                                            initargs=(fitness, True))
+        elif kind == 'process':
+            self._pool = ProcessPoolExecutor(self.n_workers, initializer=_init_worker,
+                                             initargs=(fitness, False))
+
+    def evaluate(self, positions, threshold=None, level=None):
+        if self._pool is None:
+            return evaluate_population(self.fitness, positions, threshold, level)
+        n_chunks = min(self.n_workers, len(positions))
+        chunks = zip(np.array_split(positions, n_chunks),
+                     [None] * n_chunks if threshold is None else np.array_split(threshold, n_chunks),
+                     [level] * n_chunks,
+                     [not self.trajectories] * n_chunks)
+        cost, y_hat, aborted_steps = [], [], 0
+        for c, y, a in self._pool.map(_evaluate_worker, chunks):
+            cost.append(c)
+            y_hat.extend(y)
+            aborted_steps += a
+        return np.concatenate(cost), y_hat, aborted_steps
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -0,0 +1,145 @@
+import hashlib
+
+import numpy as np
+
+
+class MultiExperiment:
+    """
+    Fitness of one set of unknown constants over several experiments.
+
+    Each experiment is a ``Model`` of the same system with its own ``x0``,
+    ``t``, observed ``y``, ``state_mask`` and ``args`` (e.g. the forcing).
+    The loss is the ``weights``-weighted mean of the experiment losses.
+    Usable by ``PSO`` wherever a ``Model`` is.
+
+    With ``vectorized`` models, experiments sharing the same grid are
+    integrated together: every candidate is replicated once per experiment
+    and the whole (nPop * N, nState) batch goes through a single RK4 loop.
+    Scalar ``args`` are stacked per row; experiments with other ``args`` are
+    integrated on their own.
+
+    Models integrating in reduced precision (``dtype``) make the whole
+    fitness reduced, and ``exact`` re-evaluates every experiment in float64.
+    """
+    fidelity = None
+    # trajectories of in-place models are copied out of their buffers
+    inplace = False
+
+    def __init__(self, models, weights=None):
+        self.models = list(models)
+        if weights is None:
+            weights = np.ones(len(self.models))
+        self.weights = np.asarray(weights, dtype=float) / np.sum(weights)
+        self.vectorized = all(m.vectorized for m in self.models)
+        self.aborted_steps = 0
+        self._groups = self._group()
+
+    def _group(self):
+        """Indices of experiments that can be stacked in one integration."""
+        groups = []
+        for e, m in enumerate(self.models):
+            for group in groups:
+                if self._stackable(self.models[group[0]], m):
+                    group.append(e)
+                    break
+            else:
+                groups.append([e])
+        return groups
+
+    @staticmethod
+    def _stackable(a, b):
+        return (type(a) is type(b) and np.array_equal(a.t, b.t)
+                and len(a.args) == len(b.args)
+                and all(np.ndim(v) == 0 for v in a.args + b.args))
+
+    @property
+    def y(self):
+        return [m.y for m in self.models]
+
+    @property
+    def unknown_const(self):
+        return self.models[0].unknown_const
+
+    @property
+    def dtype(self):
+        """Lowest integration precision among the experiments."""
+        return min((m.dtype for m in self.models), key=lambda d: d.itemsize)
+
+    def exact(self, k):
+        """Float64 loss of ``k`` over all experiments."""
+        dtypes = [m.dtype for m in self.models]
+        for m in self.models:
+            m.dtype = np.dtype(np.float64)
+        try:
+            return self.evaluate(k)[0]
+        finally:
+            for m, dtype in zip(self.models, dtypes):
+                m.dtype = dtype
+
+    def fingerprint(self):
+        h = hashlib.sha1(self.weights.tobytes())
+        for m in self.models:
+            h.update(m.fingerprint().encode())
+        return h.hexdigest()
+
+    def simulation(self, k):
+        return [m.simulation(k) for m in self.models]
+
+    def residuals(self, k):
+        """
+        Residuals of every experiment for the population ``k`` (nPop, nVar),
+        concatenated, each scaled by sqrt(weight / N) with N its number of
+        residuals. With mse losses their sum of squares is the weighted loss.
+        Integrated in float64.
+        """
+        r = []
+        for w, m in zip(self.weights, self.models):
+            r_e = m.residuals(k)
+            r.append(np.sqrt(w / r_e.shape[1]) * r_e)
+        return np.concatenate(r, axis=1)
+
+    def evaluate(self, k, threshold=None, level=None):
+        """
+        Weighted loss of ``k`` over all experiments, the observed data and
+        the predicted trajectory of each experiment.
+        """
+        if self.vectorized:
+            loss, y, y_hat = self.evaluate_batch(np.asarray(k)[None, :])
+            return loss[0], y, y_hat[0]
+        loss, y_hat = 0., []
+        for w, m in zip(self.weights, self.models):
+            loss_e, _, y_e = m.evaluate(k)
+            loss += w * loss_e
+            y_hat.append(np.array(y_e) if m.inplace else y_e)
+        return loss, self.y, y_hat
+
+    def evaluate_batch(self, k, threshold=None, level=None):
+        """
+        Weighted loss (nPop,) of the population ``k`` (nPop, nVar); the
+        trajectories are returned per particle, then per experiment.
+        """
+        k = np.asarray(k)
+        n_pop = len(k)
+        loss = np.zeros(n_pop)
+        y_hat = [[None] * len(self.models) for _ in range(n_pop)]
+        for group in self._groups:
+            models = [self.models[e] for e in group]
+            m = models[0]
+            n_exp = len(group)
+            m.unknown_const = np.repeat(k, n_exp, axis=0)
+            x0 = np.tile(np.stack([e.x0 for e in models]), (n_pop, 1))
+            args = m.args
+            if n_exp > 1:
+                args = [np.tile([e.args[j] for e in models], n_pop) for j in range(len(m.args))]
+            # (n, nPop * N, nState) -> (nPop, N, n, nState)
+            x = m.ode45(m.model, m.t, x0, *args)
+            x = x.reshape(len(m.t), n_pop, n_exp, -1).transpose(1, 2, 0, 3)
+            if m.inplace:
+                # the trajectories are returned, not the model's reusable buffer
+                x = x.copy()
+            for j, (e, model) in enumerate(zip(group, models)):
+                loss += self.weights[e] * model.loss(model.y[:, model.state_mask],
+                                                     x[:, j][..., model.state_mask])
+                for i in range(n_pop):
+                    y_hat[i][e] = x[i, j]
+        return loss, self.y, y_hat
@@ -0,0 +1,188 @@
+import copy
+import multiprocessing
+import traceback
+
+import numpy as np
+
+from .pso import PSO
+
+
+class _Island:
+    """One swarm and the commands the driver sends to it."""
+    def __init__(self, fitness, params):
+        self.pso = PSO(fitness, params)
+
+    def run(self, iterations, n_migrants):
+        for i in range(iterations):
+            self.pso.run()
+        pso = self.pso
+        best = np.argsort(pso.pb_cost_[:, 0], kind='stable')[:n_migrants]
+        return {'pbg_cost': float(np.ravel(pso.pbg_cost)[0]),
+                'pbg_position': np.array(pso.pbg_position),
+                'n_evaluations': pso.n_evaluations,
+                'migrants': (pso.pb_position_[best].copy(), pso.pb_cost_[best, 0].copy())}
+
+    def immigrate(self, positions, cost):
+        if len(positions):
+            self.pso.inject(positions, cost)
+
+    def close(self):
+        self.pso.close()
+
+
+def _serve(conn, fitness, params):
+    # replies are (ok, result); a failure sends its traceback instead
+    island, error = None, None
+    try:
+        island = _Island(fitness, params)
+    except Exception:
+        error = traceback.format_exc()
+    while True:
+        try:
+            command, args = conn.recv()
+        except EOFError:
+            # the driver went away without closing
+            command = 'close'
+        if command == 'close':
+            if island is not None:
+                island.close()
+            conn.close()
+            return
+        if island is None:
+            conn.send((False, error))
+            continue
+        try:
+            conn.send((True, getattr(island, command)(*args)))
+        except Exception:
+            conn.send((False, traceback.format_exc()))
+
+
+class _RemoteIsland:
+    def __init__(self, fitness, params):
+        self._conn, child = multiprocessing.Pipe()
+        # not daemonic: an island may run its own 'process' executor
+        self._process = multiprocessing.Process(target=_serve, args=(child, fitness, params))
+        self._process.start()
+        child.close()
+
+    def send(self, command, *args):
+        self._conn.send((command, args))
+
+    def recv(self):
+        ok, result = self._conn.recv()
+        if not ok:
+            raise Exception(f'Island process failed:\n{result}')
+        return result
+
+    def close(self):
+        try:
+            self._conn.send(('close', ()))
+        except (BrokenPipeError, OSError):
+            pass
+        self._process.join()
+        self._conn.close()
+
+
+class _LocalIsland(_Island):
+    def send(self, command, *args):
+        self._reply = getattr(self, command)(*args)
+
+    def recv(self):
+        return self._reply
+
+
+class IslandModel:
+    """
+    Island-model PSO: independent swarms, each in its own process, that
+    periodically exchange their best particles.
+
+    islands: number of islands, or one dict of ``optmizer`` overrides per
+        island (e.g. its own ``w``, weights, bounds or ``seed``).
+    interval: iterations between migrations.
+    n_migrants: best personal bests each island sends per migration; they
+        replace the worst particles of the receiving islands.
+    topology: 'ring' (island i sends to i + 1), 'full' (to every other
+        island) or a list giving the destinations of each island.
+    processes: False runs the islands one after the other in this process.
+        An error raised in an island is raised again by ``run``.
+    """
+    def __init__(self, fitness, params, islands=4, interval=10, n_migrants=2,
+                 topology='ring', processes=True):
+        if isinstance(islands, int):
+            islands = [{} for _ in range(islands)]
+        seed = params['optmizer'].get('seed')
+        self.params = []
+        for i, overrides in enumerate(islands):
+            p = copy.deepcopy(params)
+            if seed is not None:
+                p['optmizer']['seed'] = seed + i
+            p['optmizer'].update(overrides)
+            self.params.append(p)
+        n = len(self.params)
+        if topology == 'ring':
+            topology = [[(i + 1) % n] for i in range(n)]
+        elif topology == 'full':
+            topology = [[j for j in range(n) if j != i] for i in range(n)]
+        self.topology = [list(dest) for dest in topology]
+        self.interval = interval
+        self.n_migrants = n_migrants
+        self._fitness = fitness
+        island = _RemoteIsland if processes else _LocalIsland
+        self._islands = [island(fitness, p) for p in self.params]
+        self.iteration = 0
+        self.n_evaluations = 0
+        self.island_costs = np.full(n, np.inf)
+        self.pbg_cost = np.inf
+        self.pbg_position = None
+        self.pbg_y_hat = None
+
+    def run(self, iterations):
+        """Advance every island by ``iterations``, migrating every ``interval``."""
+        done = 0
+        while done < iterations:
+            step = min(self.interval - self.iteration % self.interval, iterations - done)
+            for island in self._islands:
+                island.send('run', step, self.n_migrants)
+            reports = self._gather()
+            done += step
+            self.iteration += step
+            self._collect(reports)
+            if self.iteration % self.interval == 0:
+                self._migrate(reports)
+        return self.pbg_cost, self.pbg_position
+
+    def _collect(self, reports):
+        self.island_costs = np.array([r['pbg_cost'] for r in reports])
+        self.n_evaluations = sum(r['n_evaluations'] for r in reports)
+        best = int(self.island_costs.argmin())
+        if self.island_costs[best] < self.pbg_cost:
+            self.pbg_cost = self.island_costs[best]
+            self.pbg_position = reports[best]['pbg_position']
+            self.pbg_y_hat = self._fitness.simulation(self.pbg_position)
+
+    def _migrate(self, reports):
+        incoming = [[] for _ in self._islands]
+        for i, report in enumerate(reports):
+            for j in self.topology[i]:
+                incoming[j].append(report['migrants'])
+        for island, migrants in zip(self._islands, incoming):
+            positions = np.concatenate([m[0] for m in migrants]) if migrants else np.empty((0, 0))
+            cost = np.concatenate([m[1] for m in migrants]) if migrants else np.empty(0)
+            island.send('immigrate', positions, cost)
+        self._gather()
+
+    def _gather(self):
+        # read every reply before raising, so that no island is left out of step
+        replies, error = [], None
+        for island in self._islands:
+            try:
+                replies.append(island.recv())
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+        return replies
+
+    def close(self):
+        for island in self._islands:
+            island.close()
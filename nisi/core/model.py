@@ -1,7 +1,23 @@
+import hashlib
+from collections import OrderedDict
+
 import numpy as np
 from functools import partial
 
+from .data import ObservedData
+
 class Model:
+    # Set to True in subclasses whose ``model()`` accepts a batch of states
+    # ``y[..., nState]`` with matching ``unknown_const[..., nVar]``.
+    vectorized = False
+    # Set to True in subclasses whose ``model()`` accepts an ``out`` keyword
+    # and writes every derivative into it. The integrator then runs on
+    # preallocated stage buffers and reuses its trajectory buffer.
+    inplace = False
+    # Number of buffer sets (one per trajectory shape) kept by in-place
+    # integrations; the least recently used set is dropped beyond it.
+    max_buffers = 4
+
     def __init__(self, params=None):
         if params is None:
             parameters = {}
@@ -12,6 +28,10 @@ class Model:
         self.data = None
         self.y_pred = None
         self.y_true = None
+        self._y = None
+        self._source = None
+        self._buffers = OrderedDict()
+        self.aborted_steps = 0
         self.parameters_initializer()
 
     def parameters_initializer(self):
@@ -23,6 +43,17 @@ class Model:
         t = self._params['t']
         t = np.linspace(t[0], t[1], t[2])
         self.t = t.reshape(-1,1)
+        self.fidelity = self._params.get('fidelity')
+        # experiment constants (e.g. forcing) passed to model(t, y, *args)
+        self.args = tuple(self._params.get('args', ()))
+        # record only the observed states, every ``decimate``-th sample
+        self.sparse_output = self._params.get('sparse_output', False)
+        self.decimate = self._params.get('decimate', 1)
+        # integration and loss precision, e.g. 'float32' for screening
+        self.dtype = np.dtype(self._params.get('dtype', 'float64'))
+        if self._path:
+            self._source = ObservedData(self._path, self.state_mask,
+                                        **(self._params.get('external') or {}))
         if self.loss == 'mse':
             self.loss = partial(self.mse)
         elif self.loss == 'mae':
@@ -34,14 +65,30 @@ class Model:
         else:
           self.loss = partial(self.mse)
 
+    # losses reduce the last two axes (time, state), so a leading batch
+    # axis yields one loss per particle
     def mse(self, y, y_hat):
-        return ((y - y_hat)**2).mean()
+        return ((y - y_hat)**2).mean(axis=(-2, -1))
     
     def mae(self, y, y_hat):
-        return (y - y_hat).mean()
+        return (y - y_hat).mean(axis=(-2, -1))
 
     def rmse(self,y, y_hat):
-        return np.sqrt(np.mean((y_hat-y)**2))
+        return np.sqrt(np.mean((y_hat-y)**2, axis=(-2, -1)))
+
+    @property
+    def y(self):
+        """
+        Observed states on the grid ``t``. Assigned directly, or read and
+        resampled from the ``model_path`` recording on first access.
+        """
+        if self._y is None and self._source is not None:
+            self._y = self._source.resample(self.t)
+        return self._y
+
+    @y.setter
+    def y(self, value):
+        self._y = value
 
     @property
     def unknown_const(self):
@@ -51,32 +98,336 @@ class Model:
     def unknown_const(self, value):
         self._unknown_const = value
 
+    def __getstate__(self):
+        # integration buffers are rebuilt on demand, never shipped to workers
+        state = self.__dict__.copy()
+        state['_buffers'] = OrderedDict()
+        return state
+
+    def fingerprint(self):
+        """
+        Hash of the identification problem: model class, integration grid,
+        initial state, experiment ``args``, observed data and loss.
+        """
+        h = hashlib.sha1(type(self).__qualname__.encode())
+        for a in (self.t, self.x0, self.state_mask, self.y[:, self.state_mask]):
+            h.update(np.ascontiguousarray(a, dtype=float).tobytes())
+        for a in self.args:
+            a = np.ascontiguousarray(a, dtype=float)
+            h.update(str(a.shape).encode() + a.tobytes())
+        h.update(str(self._loss_kind()).encode())
+        if self.dtype != np.float64:
+            h.update(str(self.dtype).encode())
+        return h.hexdigest()
+
     def simulation(self, k):
-        self.unknown_const = k
-        return self.ode45(self.model, self.t, self.x0)
+        """Full trajectory of ``k``, always integrated in float64."""
+        return self._float64(self._simulation, k)
+
+    def _simulation(self, k):
+        self.unknown_const = np.asarray(k, dtype=float)
+        return np.array(self.ode45(self.model, self.t, self.x0, *self.args))
+
+    def exact(self, k):
+        """Float64 loss of ``k``, re-verifying a reduced-precision evaluation."""
+        return self._float64(lambda k: self.evaluate(k)[0], k)
+
+    def _float64(self, func, k):
+        dtype, self.dtype = self.dtype, np.dtype(np.float64)
+        try:
+            return func(k)
+        finally:
+            self.dtype = dtype
         
-    def evaluate(self, k):
-        self.unknown_const = k
-        y_hat = self.ode45(self.model, self.t, self.x0)
-        loss = self.loss( self.y[:, self.state_mask] ,y_hat[:,self.state_mask])
+    def evaluate(self, k, threshold=None, level=None):
+        """
+        Loss of ``k`` against the observed states. For ``inplace`` models the
+        returned ``y_hat`` is the reusable trajectory buffer and is only valid
+        until the next integration.
+
+        With a ``threshold`` the integration is abandoned as soon as the loss
+        can no longer end below it; the loss is then reported as ``inf``.
+        ``level`` selects a coarse screening grid from ``fidelity['levels']``.
+        """
+        if level is not None:
+            return self._evaluate_level(k, level)
+        if threshold is not None and self.sse_limit(threshold) is not None:
+            return self._evaluate_bounded(k, threshold)
+        self.aborted_steps = 0
+        self.unknown_const = np.asarray(k, dtype=self.dtype)
+        if self.sparse_output:
+            y_hat = self._ode45_sparse(self.model, self.t, self.x0, *self.args)
+            return self.loss(self.observed(), y_hat), self.y, y_hat
+        y_hat = self.ode45(self.model, self.t, self.x0, *self.args)
+        loss = self.loss( self.observed() ,y_hat[:,self.state_mask])
+        return loss, self.y, y_hat
+
+    def evaluate_batch(self, k, threshold=None, level=None):
+        """
+        Evaluate a population ``k`` of shape (nPop, nVar) in a single
+        integration. Requires a ``vectorized`` model. ``threshold`` (nPop,)
+        and ``level`` behave as in ``evaluate``.
+        """
+        k = np.asarray(k)
+        if level is not None:
+            return self._evaluate_level(k, level)
+        if threshold is not None and self.sse_limit(threshold) is not None:
+            return self._evaluate_bounded(k, threshold)
+        self.aborted_steps = 0
+        self.unknown_const = k.astype(self.dtype, copy=False)
+        x0 = np.broadcast_to(self.x0, (len(k), len(self.x0)))
+        if self.sparse_output:
+            y_hat = self._ode45_sparse(self.model, self.t, x0, *self.args).swapaxes(0, 1)
+            return self.loss(self.observed(), y_hat), self.y, y_hat
+        # (n, nPop, nState) -> (nPop, n, nState)
+        y_hat = self.ode45(self.model, self.t, x0, *self.args).swapaxes(0, 1)
+        loss = self.loss(self.observed(), y_hat[..., self.state_mask])
+        return loss, self.y, y_hat
+
+    def output_index(self):
+        """Indices of ``t`` entering the loss: every ``decimate``-th sample in sparse mode."""
+        return np.arange(0, len(self.t), self.decimate if self.sparse_output else 1)
+
+    def observed(self):
+        """Observed states compared against the integration, (len(output_index()), nObs)."""
+        return self.y[self.output_index()][:, self.state_mask].astype(self.dtype, copy=False)
+
+    def residuals(self, k):
+        """
+        Prediction errors (nPop, N) on the loss samples of the observed states
+        for the population ``k`` (nPop, nVar), integrated in float64.
+        """
+        return self._float64(self._residuals, np.atleast_2d(k))
+
+    def _residuals(self, k):
+        if self.vectorized:
+            y_hat = self.evaluate_batch(k)[2]
+        else:
+            y_hat = np.stack([np.array(self.evaluate(k_i)[2]) for k_i in k])
+        if not self.sparse_output:
+            y_hat = y_hat[..., self.state_mask]
+        return (y_hat - self.observed()).reshape(len(k), -1)
+
+    def extend(self, t, y):
+        """Append observed samples ``y`` (m, nState) at the times ``t`` (m,)."""
+        t = np.reshape(np.asarray(t, dtype=float), (-1, 1))
+        y = np.reshape(np.asarray(y, dtype=float), (len(t), -1))
+        observed = self.y
+        self.t = np.concatenate([self.t, t])
+        self.y = np.concatenate([observed, y])
+
+    def integrate_window(self, k, x, start):
+        """
+        Continue the integration of ``k`` (nPop, nVar) from the states ``x``
+        (nPop, nState) at ``t[start]`` to the end of ``t``. Returns the sum of
+        squared errors of the loss samples after ``start`` (from the first one
+        when ``start`` is 0) and the trajectory (len(t) - start, nPop, nState).
+        """
+        k = np.asarray(k, dtype=self.dtype)
+        t = self.t[start:]
+        if self.vectorized:
+            self.unknown_const = k
+            x = np.array(self.ode45(self.model, t, x, *self.args))
+        else:
+            trajectories = []
+            for i in range(len(k)):
+                self.unknown_const = k[i]
+                trajectories.append(np.array(self.ode45(self.model, t, x[i], *self.args)))
+            x = np.stack(trajectories, axis=1)
+        idx = self.output_index()
+        idx = idx[idx > start] if start else idx
+        error = x[idx - start][..., self.state_mask] - self.y[idx][:, None, self.state_mask]
+        return (error**2).sum(axis=(0, 2)), x
+
+    def fidelity_index(self, level):
+        """
+        Indices of ``t`` making up screening level ``level``: every
+        ``stride``-th sample over the first ``horizon`` fraction of the grid.
+        """
+        spec = self.fidelity['levels'][level]
+        last = int(round(spec.get('horizon', 1.0) * (len(self.t) - 1)))
+        return np.arange(0, last + 1, spec.get('stride', 1))
+
+    def _evaluate_level(self, k, level):
+        idx = self.fidelity_index(level)
+        k = np.asarray(k)
+        self.aborted_steps = 0
+        self.unknown_const = k.astype(self.dtype, copy=False)
+        x0 = self.x0 if k.ndim == 1 else np.broadcast_to(self.x0, (len(k), len(self.x0)))
+        y_hat = self.ode45(self.model, self.t[idx], x0, *self.args)
+        if k.ndim == 2:
+            y_hat = y_hat.swapaxes(0, 1)
+        loss = self.loss(self.y[idx][:, self.state_mask].astype(self.dtype, copy=False),
+                         y_hat[..., self.state_mask])
         return loss, self.y, y_hat
 
+    def sse_limit(self, threshold):
+        """
+        Sum of squared errors above which the loss exceeds ``threshold``, or
+        None when the running loss is not a monotone bound (mae).
+        """
+        n = len(self.output_index()) * np.count_nonzero(self.state_mask)
+        kind = self._loss_kind()
+        if kind == 'mse':
+            return np.asarray(threshold, dtype=float) * n
+        if kind == 'rmse':
+            return np.asarray(threshold, dtype=float)**2 * n
+        return None
+
+    def _loss_kind(self):
+        return getattr(getattr(self.loss, 'func', None), '__name__', None)
+
+    def _evaluate_bounded(self, k, threshold):
+        """
+        Integrate ``k`` (nVar,) or (nPop, nVar) accumulating the squared error
+        on the observed states, and drop every particle whose running error
+        exceeds its ``sse_limit``. Abandoned rows of ``y_hat`` are left NaN.
+        In ``sparse_output`` mode only the recorded samples are kept.
+        """
+        k = np.asarray(k, dtype=self.dtype)
+        batch = k.ndim == 2
+        k_all = np.atleast_2d(k)
+        limit = np.broadcast_to(self.sse_limit(threshold), (len(k_all),))
+        idx = self.output_index()
+        y_obs = self.observed()
+        n = len(self.t)
+        # output row of each time step, -1 when the step is not recorded
+        row = np.full(n, -1)
+        row[idx] = np.arange(len(idx))
+        cols = self.state_mask if self.sparse_output else slice(None)
+        x = np.full((len(idx), len(k_all), len(self.x0[cols])), np.nan, dtype=self.dtype)
+        x[0] = self.x0[cols]
+        state = np.tile(np.asarray(self.x0, dtype=self.dtype), (len(k_all), 1))
+        sse = np.full(len(k_all), ((y_obs[0] - self.x0[self.state_mask])**2).sum(), dtype=self.dtype)
+        t = self.t.astype(self.dtype, copy=False)
+        stop = np.full(len(k_all), n - 1)
+        active = np.arange(len(k_all))
+        self.unknown_const = k_all if batch else k
+        for i in range(n - 1):
+            dt = t[i + 1] - t[i]
+            xi = state[active] if batch else state[0]
+            x_next = self.rk4_step(self.model, xi, t[i], dt, *self.args)
+            state[active] = x_next
+            r = row[i + 1]
+            if r < 0:
+                continue
+            x[r, active] = x_next[..., cols]
+            sse[active] += ((x_next[..., self.state_mask] - y_obs[r])**2).sum(axis=-1)
+            over = sse[active] > limit[active]
+            if over.any():
+                stop[active[over]] = i + 1
+                active = active[~over]
+                if not len(active):
+                    break
+                if batch:
+                    self.unknown_const = k_all[active]
+        self.aborted_steps = int((n - 1 - stop).sum())
+        loss = sse / (len(idx) * np.count_nonzero(self.state_mask))
+        if self._loss_kind() == 'rmse':
+            loss = np.sqrt(loss)
+        loss[stop < n - 1] = np.inf
+        if batch:
+            return loss, self.y, x.swapaxes(0, 1)
+        return loss[0], self.y, x[:, 0]
+
     def ode45(self, f, t, x0, *args):
         """
         4th Order Runge-Kutta method
-        """
-        def ode45_step(f, x, t, dt, *args):
-            k = dt
-            k1 = k * f(t, x, *args)
-            k2 = k * f(t + 0.5 * k, x + 0.5 * k1, *args)
-            k3 = k * f(t + 0.5 * k, x + 0.5 * k2, *args)
-            k4 = k * f(t + dt, x + k3, *args)
-            return x + 1 / 6. * (k1 + 2 * k2 + 2 * k3 + k4)
 
+        ``x0`` may be a single state (nState,) or a batch (nPop, nState);
+        the trajectory has shape (len(t),) + x0.shape.
+        """
+        if self.inplace:
+            return self._ode45_inplace(f, t, x0, *args)
         n = len(t)
-        x = np.zeros((n,len(x0)))
-        x[0,:] = x0
+        t = np.asarray(t, dtype=self.dtype)
+        x = np.zeros((n,) + np.shape(x0), dtype=self.dtype)
+        x[0] = x0
         for i in range(n - 1):
             dt = t[i + 1] - t[i]
-            x[i + 1,:] = ode45_step(f, x[i,:],  t[i], dt, *args)
+            x[i + 1] = self.rk4_step(f, x[i],  t[i], dt, *args)
         return x
+
+    @staticmethod
+    def rk4_step(f, x, t, dt, *args):
+        k = dt
+        k1 = k * f(t, x, *args)
+        k2 = k * f(t + 0.5 * k, x + 0.5 * k1, *args)
+        k3 = k * f(t + 0.5 * k, x + 0.5 * k2, *args)
+        k4 = k * f(t + dt, x + k3, *args)
+        return x + 1 / 6. * (k1 + 2 * k2 + 2 * k3 + k4)
+
+    def _get_buffers(self, n, shape):
+        # one set of buffers per trajectory shape, e.g. per fidelity level
+        key = (n,) + shape + (self.dtype.str,)
+        buf = self._buffers.get(key)
+        if buf is None:
+            buf = {'x': np.empty((n,) + shape, dtype=self.dtype)}
+            for name in ('k1', 'k2', 'k3', 'k4', 'xs'):
+                buf[name] = np.empty(shape, dtype=self.dtype)
+            self._buffers[key] = buf
+        self._buffers.move_to_end(key)
+        # varying batch sizes (surrogate, screening, chunks) would pile up
+        while len(self._buffers) > self.max_buffers:
+            self._buffers.popitem(last=False)
+        return buf
+
+    def _ode45_inplace(self, f, t, x0, *args):
+        """
+        Runge-Kutta 4 on preallocated stage buffers, ``f(t, x, *args, out=k)``.
+        """
+        t = np.ravel(t).tolist()
+        buf = self._get_buffers(len(t), np.shape(x0))
+        x = buf['x']
+        x[0] = x0
+        for i in range(len(t) - 1):
+            self._rk4_step_inplace(f, x[i], t[i], t[i + 1] - t[i], buf, x[i + 1], *args)
+        return x
+
+    @staticmethod
+    def _rk4_step_inplace(f, xi, t, dt, buf, out, *args):
+        k1, k2, k3, k4, xs = (buf[key] for key in ('k1', 'k2', 'k3', 'k4', 'xs'))
+        f(t, xi, *args, out=k1)
+        np.multiply(k1, 0.5 * dt, out=xs)
+        xs += xi
+        f(t + 0.5 * dt, xs, *args, out=k2)
+        np.multiply(k2, 0.5 * dt, out=xs)
+        xs += xi
+        f(t + 0.5 * dt, xs, *args, out=k3)
+        np.multiply(k3, dt, out=xs)
+        xs += xi
+        f(t + dt, xs, *args, out=k4)
+        # out = xi + dt / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+        k2 += k3
+        k2 *= 2.
+        k2 += k1
+        k2 += k4
+        k2 *= dt / 6.
+        np.add(xi, k2, out=out)
+
+    def _ode45_sparse(self, f, t, x0, *args):
+        """
+        Runge-Kutta 4 keeping only the ``state_mask`` columns at the
+        ``output_index`` samples, shape (len(output_index()),) + x0.shape[:-1]
+        + (nObs,). Only two full states are held at any time.
+        """
+        t = np.ravel(t).tolist()
+        idx = self.output_index()
+        shape = np.shape(x0)
+        y_hat = np.empty((len(idx),) + shape[:-1] + (np.count_nonzero(self.state_mask),),
+                         dtype=self.dtype)
+        buf = self._get_buffers(2, shape) if self.inplace else None
+        x = buf['x'] if self.inplace else np.empty((2,) + shape, dtype=self.dtype)
+        x[0] = x0
+        y_hat[0] = x[0][..., self.state_mask]
+        r = 1
+        for i in range(idx[-1]):
+            xi, x_next = x[i % 2], x[(i + 1) % 2]
+            if self.inplace:
+                self._rk4_step_inplace(f, xi, t[i], t[i + 1] - t[i], buf, x_next, *args)
+            else:
+                x_next[...] = self.rk4_step(f, xi, t[i], t[i + 1] - t[i], *args)
+            if r < len(idx) and idx[r] == i + 1:
+                y_hat[r] = x_next[..., self.state_mask]
+                r += 1
+        return y_hat
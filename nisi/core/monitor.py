@@ -0,0 +1,140 @@
+import multiprocessing
+import os
+import queue
+import time
+
+import numpy as np
+
+from .observers import Observer
+
+
+def _first(y):
+    # multi-experiment fitness: show the first experiment
+    return y[0] if isinstance(y, list) else y
+
+
+def _render(snapshots, fps, frames_dir, lowBound, upBound, reference):
+    import matplotlib
+    if frames_dir is not None:
+        matplotlib.use('Agg')
+        os.makedirs(frames_dir, exist_ok=True)
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=(12, 4), facecolor='white')
+    particle = fig.add_subplot(221, frameon=False)
+    graph_cost = fig.add_subplot(222, frameon=False)
+    func1 = fig.add_subplot(223, frameon=False)
+    func2 = fig.add_subplot(224, frameon=False)
+    if frames_dir is None:
+        plt.show(block=False)
+
+    iterations, cost = [], []
+    y = pbg_y_hat = None
+    frame = 0
+    while True:
+        start = time.perf_counter()
+        latest, done = None, False
+        # drain the queue, only the newest snapshot gets drawn
+        while True:
+            try:
+                snapshot = snapshots.get(timeout=1. / fps if latest is None else 0)
+            except queue.Empty:
+                break
+            if snapshot is None:
+                done = True
+                break
+            latest = snapshot
+            iterations.append(snapshot['iteration'])
+            cost.append(snapshot['pbg_cost'])
+            y = snapshot.get('y', y)
+            pbg_y_hat = snapshot.get('pbg_y_hat', pbg_y_hat)
+        if latest is not None:
+            position, pbg_position = latest['position'], latest['pbg_position']
+            particle.cla()
+            particle.plot(position[:, 0], position[:, 1], '.')
+            particle.plot(pbg_position[0], pbg_position[1], 'x')
+            if reference is not None:
+                particle.plot(reference[0], reference[1], 'o')
+            if lowBound is not None:
+                particle.set_xlim(lowBound[0], upBound[0])
+                particle.set_ylim(lowBound[1], upBound[1])
+            particle.set_title(np.array2string(pbg_position, precision=4), fontsize=8)
+
+            graph_cost.cla()
+            graph_cost.semilogy(iterations, cost)
+            graph_cost.set_title(f"e={latest['pbg_cost']:.4g} (i={latest['iteration']})", fontsize=8)
+
+            if y is not None and pbg_y_hat is not None:
+                func1.cla()
+                func2.cla()
+                for j in range(y.shape[1]):
+                    func1.plot(y[:, j])
+                    func1.plot(pbg_y_hat[:, j], '--')
+                if y.shape[1] > 1:
+                    func2.plot(y[:, 0], y[:, 1])
+                    func2.plot(pbg_y_hat[:, 0], pbg_y_hat[:, 1], '--')
+
+            if frames_dir is None:
+                plt.draw()
+                plt.pause(0.001)
+            else:
+                fig.savefig(os.path.join(frames_dir, f'frame_{frame:06d}.png'))
+            frame += 1
+        if done:
+            break
+        time.sleep(max(0., 1. / fps - (time.perf_counter() - start)))
+    plt.close(fig)
+
+
+class LiveMonitor(Observer):
+    """
+    Draws the swarm, the global best cost and the best fit in a separate
+    process, so that the optimizer never waits for the GUI.
+
+    Snapshots are taken at most ``fps`` times per second and dropped when
+    the renderer lags behind. With ``frames_dir`` the frames are written as
+    PNG files instead of being shown (headless). ``lowBound``/``upBound``
+    and ``reference`` (e.g. the true constants) frame the particle plot.
+    """
+    def __init__(self, fps=10, frames_dir=None, lowBound=None, upBound=None, reference=None):
+        self.fps = fps
+        self._last = -np.inf
+        self._send_y = True
+        self._new_best = True
+        self._queue = multiprocessing.Queue(maxsize=2)
+        self._process = multiprocessing.Process(target=_render, daemon=True,
+                                        args=(self._queue, fps, frames_dir, lowBound, upBound, reference))
+        self._process.start()
+
+    def on_new_global_best(self, pso, stats):
+        self._new_best = True
+
+    def on_iteration(self, pso, stats):
+        now = time.perf_counter()
+        if now - self._last < 1. / self.fps:
+            return
+        snapshot = {'iteration': stats['iteration'],
+                    'position': np.array(pso.p_position_),
+                    'pbg_position': np.array(pso.pbg_position),
+                    'pbg_cost': float(np.ravel(pso.pbg_cost)[0])}
+        # the observed data once, the best fit only when it changed
+        if self._send_y:
+            snapshot['y'] = _first(pso.y)
+        if self._new_best:
+            snapshot['pbg_y_hat'] = _first(pso.pbg_y_hat)
+        try:
+            self._queue.put_nowait(snapshot)
+        except queue.Full:
+            return
+        self._last = now
+        self._send_y = self._new_best = False
+
+    def close(self, timeout=5.):
+        """Stop the renderer once it has drawn the last snapshot."""
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
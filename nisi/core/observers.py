@@ -0,0 +1,57 @@
+import json
+
+import numpy as np
+
+
+class Observer:
+    """
+    Base class of PSO observers, registered with ``PSO.add_observer``.
+    Each event receives the optimizer and the stats of the current
+    iteration (timings in seconds and evaluation counts).
+    """
+    def on_iteration(self, pso, stats):
+        pass
+
+    def on_new_global_best(self, pso, stats):
+        pass
+
+    def on_escape_reinit(self, pso, stats):
+        pass
+
+
+def _jsonable(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class JsonlEventSink(Observer):
+    """
+    Appends one JSON line per event to ``path``. Lines are buffered by the
+    file object; ``every`` thins out on_iteration events.
+    """
+    def __init__(self, path, every=1):
+        self.every = every
+        self._file = open(path, 'a')
+
+    def write(self, event, pso, stats):
+        record = {'event': event,
+                  'pbg_cost': _jsonable(np.ravel(pso.pbg_cost)[0]),
+                  'pbg_position': _jsonable(pso.pbg_position)}
+        record.update((key, _jsonable(value)) for key, value in stats.items())
+        self._file.write(json.dumps(record) + '\n')
+
+    def on_iteration(self, pso, stats):
+        if stats['iteration'] % self.every == 0:
+            self.write('iteration', pso, stats)
+
+    def on_new_global_best(self, pso, stats):
+        self.write('new_global_best', pso, stats)
+
+    def on_escape_reinit(self, pso, stats):
+        self.write('escape_reinit', pso, stats)
+
+    def close(self):
+        self._file.close()
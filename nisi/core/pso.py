@@ -1,5 +1,13 @@
+import json
+import time
+
 import numpy as np
 
+from .cache import EvaluationCache
+from .executor import Executor, final_state
+from .refine import levenberg_marquardt
+from .surrogate import Surrogate
+
 class Particle:
     def __init__(self, params):
         self._params = params['optmizer']
@@ -14,6 +22,7 @@ class Particle:
         self.beta = self._params['beta']
         self.escape_min_vel_percent = self._params['escape_min_vel_percent']
         self.escape_min_error = self._params['escape_min_error']
+        self.rng = np.random.default_rng(self._params.get('seed'))
 
         self.lowBound = np.empty([self.nPop, self.nVar])
         self.upBound = np.empty([self.nPop, self.nVar])
@@ -27,7 +36,7 @@ class Particle:
     def particles_initializer(self) -> None:
         self.lowBound = np.ones([self.nPop, self.nVar]) * np.array(self._params['lowBound'])
         self.upBound =  np.ones([self.nPop, self.nVar]) * np.array(self._params['upBound'])
-        self.p_position_ = (self.upBound - self.lowBound) * np.random.rand(self.nPop, self.nVar) + self.lowBound
+        self.p_position_ = (self.upBound - self.lowBound) * self.rng.random((self.nPop, self.nVar)) + self.lowBound
         self.p_velocity_ = np.zeros([self.nPop, self.nVar])
 
     def limits(self, values, state=None):
@@ -42,59 +51,391 @@ class Particle:
     def update_particle(self):
         # update velocity
         up_vel = self.w * self.p_velocity_ \
-                 + self.cognitive_weight * np.random.rand(self.nPop, self.nVar) * (self.pb_position_ - self.p_position_) \
-                 + self.social_weight * np.random.rand(self.nPop,  self.nVar) * (self.pbg_position - self.p_position_)
+                 + self.cognitive_weight * self.rng.random((self.nPop, self.nVar)) * (self.pb_position_ - self.p_position_) \
+                 + self.social_weight * self.rng.random((self.nPop, self.nVar)) * (self.pbg_position - self.p_position_)
         self.p_velocity_ = self.limits(up_vel, state='velocity')
         # update position
         up_pos = self.p_position_ + self.beta*self.p_velocity_
         self.p_position_ = self.limits(up_pos, state='position')
 
 
+class OptimizeResult:
+    """
+    Outcome of ``PSO.optimize``: best ``position`` and ``cost``, the work
+    spent (``iterations``, ``evaluations``, ``time`` in seconds), the
+    ``reason`` the loop stopped and the global best cost after every
+    iteration (``history``).
+    """
+    def __init__(self, position, cost, iterations, evaluations, time, reason, history):
+        self.position = position
+        self.cost = cost
+        self.iterations = iterations
+        self.evaluations = evaluations
+        self.time = time
+        self.reason = reason
+        self.history = history
+
+    def __repr__(self):
+        return (f'OptimizeResult(cost={self.cost:.6g}, iterations={self.iterations}, '
+                f'evaluations={self.evaluations}, reason={self.reason!r})')
+
+
 class PSO(Particle):
-    def __init__(self, eq_system, params=None):
+    # swarm state written by save_checkpoint
+    _checkpoint_arrays = ('lowBound', 'upBound', 'p_position_', 'p_velocity_', 'p_cost_',
+                          'pb_position_', 'pb_cost_', 'pbg_position')
+
+    def __init__(self, eq_system, params=None, checkpoint=None):
         super(PSO, self).__init__(params)
         if params is None:
             raise Exception('Please provide Params')
         self._params = params['optmizer']
         self._fitness = eq_system
+        self._executor = Executor(eq_system, self._params.get('executor', 'serial'),
+                                  self._params.get('n_workers'))
         self.p_cost_ = np.empty([self.nPop, 1])
         self.pb_cost_ = np.empty([self.nPop, 1])
         self.pbg_cost = np.empty(1)
         self.cost_tmp = np.empty(1)
-        self.pso_initializer()
+        self.early_abandon = self._params.get('early_abandon', False)
+        self._cache = None
+        if self._params.get('cache') is not None:
+            fingerprint = getattr(eq_system, 'fingerprint', lambda: '')()
+            self._cache = EvaluationCache(fingerprint=fingerprint, **self._params['cache'])
+        self._surrogate = None
+        if self._params.get('surrogate') is not None:
+            self._surrogate = Surrogate(self._params['lowBound'], self._params['upBound'],
+                                        **self._params['surrogate'])
+        self.refinement = self._params.get('refine')
+        if self.refinement is not None and not hasattr(eq_system, 'residuals'):
+            raise Exception('refine needs a fitness with a residuals(k) method')
+        self._stagnant = 0
+        self.stats = {}
+        self.observers = []
+        self.iteration = 0
+        self.n_evaluations = 0
+        # n_evaluations not to exceed while ``optimize`` runs under a budget
+        self._evaluation_limit = None
+        if checkpoint is None:
+            self.pso_initializer()
+        else:
+            self.load_checkpoint(checkpoint)
 
     def pso_initializer(self):
         self.pbg_cost = float('inf')
         self.cost_tmp = self.pbg_cost
+        self.p_cost_, y_hat, final = self.evaluate_population()
         for i in range(self.nPop):
-            self.p_cost_[i], self.y, self.y_hat = self._fitness.evaluate(self.p_position_[i, :])
+            self.y_hat = y_hat[i]
             self.pb_position_[i, :] = self.p_position_[i, :]
             self.pb_cost_[i] = self.p_cost_[i]
-        self.pbg_position = self.pb_position_[self.pb_cost_.argmin(), :]
-        self.pbg_y_hat = self.y_hat
+        self._pb_state = final
+        self.pbg_position = self.pb_position_[self.pb_cost_.argmin(), :].copy()
+        self.pbg_y_hat = self.trajectory(self.pb_cost_.argmin(), y_hat)
+
+    def evaluate_population(self, threshold=None):
+        """
+        Cost (nPop, 1), predicted trajectory and final state of every
+        particle. With a ``threshold`` (nPop,) particles that cannot beat it
+        are abandoned early and reported with an ``inf`` cost, as are
+        particles dropped by the surrogate pre-screening or the multi-fidelity
+        screening. Costs served by the cache, and those of process workers,
+        come without a trajectory (None).
+        """
+        cost = np.full([self.nPop, 1], np.inf)
+        y_hat = [None] * self.nPop
+        final = [None] * self.nPop
+        todo = np.arange(self.nPop)
+        if self._cache is not None:
+            cached = [self._cache.get(self.p_position_[i]) for i in range(self.nPop)]
+            todo = np.array([i for i, c in enumerate(cached) if c is None], dtype=int)
+            for i, c in enumerate(cached):
+                if c is not None:
+                    cost[i] = c
+        predicted = np.full(self.nPop, np.nan)
+        saved = 0
+        if self._surrogate is not None:
+            chosen, prediction = self._surrogate.choose(self.p_position_[todo], self.rng)
+            if prediction is not None:
+                predicted[todo] = prediction
+            saved = len(todo) - len(chosen)
+            todo = todo[chosen]
+        start = time.perf_counter()
+        todo, screened = self.screen(todo)
+        screening = time.perf_counter() - start
+        aborted_steps = 0
+        if len(todo):
+            cost[todo], y_todo, aborted_steps = self._executor.evaluate(
+                self.p_position_[todo], None if threshold is None else threshold[todo])
+            for i, y in zip(todo, y_todo):
+                if self._executor.trajectories:
+                    y_hat[i] = y
+                    final[i] = self._final_state(y)
+                else:
+                    final[i] = y
+            if self._cache is not None:
+                for i in todo:
+                    # abandoned evaluations only bound the cost from below
+                    if np.isfinite(cost[i, 0]):
+                        self._cache.put(self.p_position_[i], cost[i, 0])
+            if self._surrogate is not None:
+                self._surrogate.add(self.p_position_[todo], cost[todo])
+        self.y = self._fitness.y
+        self.n_evaluations += len(todo) + screened
+        self.stats = {'time_evaluation': time.perf_counter() - start,
+                      'time_screening': screening,
+                      'evaluations': len(todo) + screened,
+                      'total_evaluations': self.n_evaluations,
+                      'screened': screened,
+                      'aborted': int(np.isinf(cost[todo]).sum()) if threshold is not None else 0,
+                      'steps_saved': aborted_steps}
+        if self._surrogate is not None:
+            checked = todo[np.isfinite(cost[todo, 0]) & np.isfinite(predicted[todo])]
+            error = np.abs(predicted[checked] - cost[checked, 0]).mean() if len(checked) else np.nan
+            self.stats.update(surrogate_saved=saved, surrogate_error=float(error))
+        if self._cache is not None:
+            self.stats.update(cache_hits=self._cache.hits, cache_misses=self._cache.misses)
+        return cost, y_hat, final
+
+    def screen(self, todo):
+        """
+        Multi-fidelity screening of particles ``todo`` on the coarse levels of
+        the fitness ``fidelity`` spec; only the best ``promote`` fraction of
+        each level reaches the next one. Returns the promoted particles and
+        the number of screening evaluations.
+        """
+        fidelity = getattr(self._fitness, 'fidelity', None)
+        screened = 0
+        if not fidelity:
+            return todo, screened
+        for level in range(len(fidelity['levels'])):
+            if len(todo) <= 1:
+                break
+            cost, _, _ = self._executor.evaluate(self.p_position_[todo], None, level)
+            screened += len(todo)
+            n_keep = max(1, int(np.ceil(fidelity.get('promote', 0.2) * len(todo))))
+            # unstable (nan) coarse integrations sort last
+            todo = np.sort(todo[np.argsort(cost[:, 0], kind='stable')[:n_keep]])
+        return todo, screened
+
+    def trajectory(self, i, y_hat):
+        """
+        Copy of the full trajectory of particle ``i``, re-simulated when not
+        at hand or when the fitness only records the observed states.
+        """
+        if y_hat[i] is None or getattr(self._fitness, 'sparse_output', False):
+            return self._fitness.simulation(self.p_position_[i, :])
+        if isinstance(y_hat[i], list):
+            # one trajectory per experiment
+            return [np.array(y) for y in y_hat[i]]
+        return np.array(y_hat[i])
+
+    def _final_state(self, y_hat):
+        """Last state of a full trajectory, kept to resume integrations in ``extend``."""
+        return final_state(self._fitness, y_hat)
+
+    def extend(self, t, y):
+        """
+        Append the observed samples ``y`` (m, nState) at times ``t`` (m,) and
+        update the personal and global bests to the longer recording, keeping
+        the swarm. Personal bests whose final state is known resume their
+        integration from it, so only the new window is integrated; the others
+        are integrated over the whole recording. Requires an mse or rmse loss.
+        """
+        start = time.perf_counter()
+        fitness = self._fitness
+        kind = fitness._loss_kind()
+        if kind not in ('mse', 'rmse'):
+            raise Exception('Incremental updates need an mse or rmse loss')
+        n_old = len(fitness.t)
+        n_obs = len(fitness.output_index()) * np.count_nonzero(fitness.state_mask)
+        cost = self.pb_cost_[:, 0].astype(float)
+        sse = (cost**2 if kind == 'rmse' else cost) * n_obs
+        fitness.extend(t, y)
+        resumed = np.array([s is not None for s in self._pb_state], dtype=bool)
+        window = None
+        if resumed.any():
+            window_sse, window = fitness.integrate_window(
+                self.pb_position_[resumed], np.stack([s for s in self._pb_state if s is not None]),
+                n_old - 1)
+            sse[resumed] += window_sse
+        if not resumed.all():
+            x0 = np.broadcast_to(fitness.x0, (np.count_nonzero(~resumed), len(fitness.x0)))
+            sse[~resumed], full = fitness.integrate_window(self.pb_position_[~resumed], x0, 0)
+        for j, i in enumerate(np.flatnonzero(resumed)):
+            self._pb_state[i] = np.array(window[-1, j])
+        for j, i in enumerate(np.flatnonzero(~resumed)):
+            self._pb_state[i] = np.array(full[-1, j])
+        n_obs = len(fitness.output_index()) * np.count_nonzero(fitness.state_mask)
+        cost = sse / n_obs
+        self.pb_cost_[:, 0] = np.sqrt(cost) if kind == 'rmse' else cost
+        # the cached costs and the surrogate archive refer to the old data
+        if self._cache is not None:
+            self._cache = EvaluationCache(fingerprint=fitness.fingerprint(), **self._params['cache'])
+        if self._surrogate is not None:
+            self._surrogate = Surrogate(self._params['lowBound'], self._params['upBound'],
+                                        **self._params['surrogate'])
+        # workers hold copies of the fitness with the old data
+        kind = self._executor.kind
+        self._executor.shutdown()
+        self._executor = Executor(fitness, kind, self._params.get('n_workers'))
+        self.y = fitness.y
+        previous = np.array(self.pbg_position)
+        self.pbg_cost = float('inf')
+        best = int(self.pb_cost_[:, 0].argmin())
+        self.verify(best)
+        while int(self.pb_cost_[:, 0].argmin()) != best:
+            best = int(self.pb_cost_[:, 0].argmin())
+            self.verify(best)
+        self.pbg_cost = self.pb_cost_[best].copy()
+        self.pbg_position = self.pb_position_[best].copy()
+        if resumed[best] and np.array_equal(previous, self.pbg_position) and \
+                isinstance(self.pbg_y_hat, np.ndarray) and len(self.pbg_y_hat) == n_old:
+            j = np.count_nonzero(resumed[:best])
+            self.pbg_y_hat = np.concatenate([self.pbg_y_hat, window[1:, j]])
+        else:
+            self.pbg_y_hat = fitness.simulation(self.pbg_position)
+        self.cost_tmp = self.pbg_cost
+        self.n_evaluations += int(np.count_nonzero(~resumed))
+        self.stats = {'time_extend': time.perf_counter() - start,
+                      'samples': len(fitness.t),
+                      'resumed': int(np.count_nonzero(resumed)),
+                      'recomputed': int(np.count_nonzero(~resumed))}
+
+    def save_checkpoint(self, path):
+        """
+        Write the swarm state (positions, velocities, personal and global
+        bests, inertia/escape state, refinement stagnation counter and RNG
+        state) to an ``.npz`` file.
+        ``pbg_y_hat`` is re-simulated on load. The surrogate archive and the
+        evaluation cache entries are saved with the swarm; a persistent
+        evaluation cache is also saved to its own path.
+        """
+        state = {name: getattr(self, name) for name in self._checkpoint_arrays}
+        state['pbg_cost'] = np.reshape(self.pbg_cost, -1)
+        state['w'] = self.w
+        state['w_damping'] = self.w_damping
+        state['iteration'] = self.iteration
+        state['n_evaluations'] = self.n_evaluations
+        state['stagnant'] = self._stagnant
+        state['rng'] = json.dumps(self.rng.bit_generator.state)
+        if self._surrogate is not None:
+            state['surrogate_x'] = self._surrogate._x
+            state['surrogate_cost'] = self._surrogate._cost
+        if self._cache is not None:
+            state['cache_keys'], state['cache_cost'] = self._cache.entries()
+        with open(path, 'wb') as f:
+            np.savez(f, **state)
+        if self._cache is not None and self._cache.path is not None:
+            self._cache.save()
+
+    def load_checkpoint(self, path):
+        """Restore a state written by ``save_checkpoint``."""
+        with np.load(path) as state:
+            for name in self._checkpoint_arrays:
+                setattr(self, name, state[name].copy())
+            self.pbg_cost = state['pbg_cost'].copy()
+            self.w = float(state['w'])
+            self.w_damping = float(state['w_damping'])
+            self.iteration = int(state['iteration'])
+            self.n_evaluations = int(state['n_evaluations'])
+            self._stagnant = int(state['stagnant']) if 'stagnant' in state else 0
+            self.rng.bit_generator.state = json.loads(str(state['rng']))
+            if self._surrogate is not None and 'surrogate_x' in state:
+                self._surrogate._x = state['surrogate_x'].copy()
+                self._surrogate._cost = state['surrogate_cost'].copy()
+            if self._cache is not None and 'cache_keys' in state:
+                # the cache as it was at the save, even when its file moved on
+                self._cache.restore(state['cache_keys'], state['cache_cost'])
+        self.nPop = len(self.p_position_)
+        self._pb_state = [None] * self.nPop
+        self.cost_tmp = self.pbg_cost
+        self.y = self._fitness.y
+        self.pbg_y_hat = self._fitness.simulation(self.pbg_position)
+
+    def close(self):
+        """Release the evaluation workers and persist the evaluation cache."""
+        self._executor.shutdown()
+        if self._cache is not None and self._cache.path is not None:
+            self._cache.save()
 
     def update_cost(self):
+        threshold = self.pb_cost_[:, 0] if self.early_abandon else None
+        self.p_cost_, y_hat, final = self.evaluate_population(threshold)
+        best = None
         for i in range(self.nPop):
-            self.p_cost_[i], self.y, self.y_hat = self._fitness.evaluate(self.p_position_[i, :])
+            self.y_hat = y_hat[i]
             if self.p_cost_[i] < self.pb_cost_[i]:
                 # update best particle values
                 self.pb_position_[i, :] = self.p_position_[i, :]
                 self.pb_cost_[i] = self.p_cost_[i]
+                self._pb_state[i] = final[i]
                 # update best global particle values
-            if self.pb_cost_[i] < self.pbg_cost:
-                self.pbg_cost = self.pb_cost_[i]
-                self.pbg_position = self.p_position_[i, :]
-                self.pbg_y_hat = self.y_hat
+            if self.pb_cost_[i] < self.pbg_cost and self.verify(i):
+                self.pbg_cost = self.pb_cost_[i].copy()
+                self.pbg_position = self.p_position_[i, :].copy()
+                best = i
+        if best is not None:
+            self.pbg_y_hat = self.trajectory(best, y_hat)
         self.w *= self.w_damping
         self.cost_tmp = self.pbg_cost
 
+    def verify(self, i):
+        """
+        Re-evaluate personal best ``i`` in float64 when the fitness integrates
+        in reduced precision, before it may become the global best. Returns
+        whether it still beats the global best.
+        """
+        if getattr(self._fitness, 'dtype', np.float64) == np.float64:
+            return True
+        self.pb_cost_[i] = self._fitness.exact(self.pb_position_[i])
+        self.n_evaluations += 1
+        return bool(self.pb_cost_[i] < self.pbg_cost)
+
+    def inject(self, positions, cost=None):
+        """
+        Replace the particles with the worst personal bests by ``positions``
+        (n, nVar), clipped to the bounds. Their ``cost`` is evaluated when not
+        given, or when clipping moved them; the global best follows.
+        """
+        positions = np.atleast_2d(positions)[:self.nPop]
+        clipped = np.clip(positions, self.lowBound[:len(positions)], self.upBound[:len(positions)])
+        if cost is None or not np.array_equal(clipped, positions):
+            cost = self._executor.evaluate(clipped)[0]
+            self.n_evaluations += len(clipped)
+        cost = np.reshape(cost, (len(clipped), 1))
+        if self._surrogate is not None:
+            self._surrogate.add(clipped, cost)
+        worst = np.argsort(-self.pb_cost_[:, 0], kind='stable')[:len(clipped)]
+        self.p_position_[worst] = clipped
+        self.p_velocity_[worst] = 0.
+        self.p_cost_[worst] = cost
+        self.pb_position_[worst] = clipped
+        self.pb_cost_[worst] = cost
+        for i in worst:
+            self._pb_state[i] = None
+        best = worst[cost[:, 0].argmin()]
+        if self.pb_cost_[best] < self.pbg_cost and self.verify(best):
+            self.pbg_cost = self.pb_cost_[best].copy()
+            self.pbg_position = self.pb_position_[best].copy()
+            self.pbg_y_hat = self._fitness.simulation(self.pbg_position)
+
+    def add_observer(self, observer):
+        """Register an ``Observer`` notified after every iteration."""
+        self.observers.append(observer)
+
     def run(self):
+        start = time.perf_counter()
         self.update_particle()
+        velocity = time.perf_counter()
+        pbg_cost = self.pbg_cost
         self.update_cost()
+        escape = False
         # Escape local mininal
         if self.pbg_cost > self.escape_min_error:
             if (abs(self.p_velocity_).mean() < self.maxVelocity * self.escape_min_vel_percent):
                 self.particles_initializer()
+                escape = True
         else:
             if (abs(self.p_velocity_).mean() < self.maxVelocity * self.escape_min_vel_percent):
                 self.w_damping = 1.01
@@ -102,6 +443,186 @@ class PSO(Particle):
             else:
                 self.w = self._params['w']
                 self.w_damping = self._params['w_damping']
+        if self.refinement is not None:
+            self._stagnant = 0 if self.pbg_cost < pbg_cost else self._stagnant + 1
+            if self._stagnant >= self.refinement.get('stagnation', 20):
+                self._stagnant = 0
+                options = {key: value for key, value in self.refinement.items()
+                           if key != 'stagnation'}
+                if self._evaluation_limit is not None:
+                    options['max_evaluations'] = self._evaluation_limit - self.n_evaluations
+                self.refine(**options)
+        self.iteration += 1
+        self.stats.update(iteration=self.iteration,
+                          escape=escape,
+                          time_velocity=velocity - start,
+                          time_bookkeeping=time.perf_counter() - velocity - self.stats['time_evaluation'])
+        self.notify(new_global_best=self.pbg_cost < pbg_cost, escape=escape)
+
+    def refine(self, **options):
+        """
+        Levenberg-Marquardt refinement of ``pbg_position`` on the residuals of
+        the fitness (see ``levenberg_marquardt`` for the ``options``). An
+        improved point replaces the worst particle and becomes the global
+        best. Runs automatically after ``optmizer['refine']['stagnation']``
+        iterations without improvement when ``optmizer['refine']`` is set.
+        ``max_evaluations`` includes the final evaluation of the refined
+        point; nothing is done when it cannot fit one Levenberg-Marquardt step.
+        """
+        if not hasattr(self._fitness, 'residuals'):
+            raise Exception('refine needs a fitness with a residuals(k) method')
+        if options.get('max_evaluations') is not None:
+            # the final evaluation, and its float64 check in reduced precision
+            reserved = 1 if getattr(self._fitness, 'dtype', np.float64) == np.float64 else 2
+            options['max_evaluations'] -= reserved
+            if options['max_evaluations'] < self.nVar + 2:
+                return False
+        start = time.perf_counter()
+        k, _, evaluations, iterations = levenberg_marquardt(
+            self._fitness.residuals, np.ravel(self.pbg_position),
+            self._params['lowBound'], self._params['upBound'], **options)
+        cost = self._fitness.evaluate(k)[0] if getattr(self._fitness, 'dtype', np.float64) == \
+            np.float64 else self._fitness.exact(k)
+        evaluations += 1
+        self.n_evaluations += evaluations
+        improved = bool(cost < self.pbg_cost)
+        if improved:
+            self.inject(k[None, :], np.array([cost]))
+        self.stats.update(refine_evaluations=evaluations, refine_iterations=iterations,
+                          refine_cost=float(cost), refine_improved=improved,
+                          time_refine=time.perf_counter() - start)
+        return improved
+
+    def optimize(self, max_iterations=1000, max_evaluations=None, max_time=None,
+                 stagnation=None, stagnation_tol=0., cost_tol=None, adaptive=None):
+        """
+        Iterate until a stopping criterion holds and return an ``OptimizeResult``.
+
+        max_iterations, max_evaluations, max_time: budgets; an iteration is
+            only started when its evaluations and its duration (both those
+            of the previous one) still fit in the budget. The evaluations
+            are at least those of a full swarm with its screening levels.
+            A refinement or a swarm growth is cut to the evaluations left.
+        stagnation: stop when ``pbg_cost`` has not improved by more than
+            ``stagnation_tol`` (relative) over that many iterations.
+        cost_tol: stop as soon as ``pbg_cost <= cost_tol``.
+        adaptive: {'min': 5, 'max': 4 * nPop, 'shrink': 0.5, 'grow': 2.0,
+            'collapse': 1e-3} resizes the swarm: it shrinks to the best
+            ``shrink`` fraction once the particles are spread over less than
+            ``collapse`` of the search range, and grows by ``grow`` after an
+            escape re-initialization.
+        """
+        if adaptive is not None:
+            adaptive = dict({'min': 5, 'max': 4 * self.nPop, 'shrink': 0.5, 'grow': 2.0,
+                             'collapse': 1e-3}, **adaptive)
+        start = time.perf_counter()
+        evaluations = self.n_evaluations
+        if max_evaluations is not None:
+            self._evaluation_limit = evaluations + max_evaluations
+        history = []
+        duration = 0.
+        # evaluations of the last iteration, refinement and resizing aside
+        used = 0
+        reason = 'max_iterations'
+        try:
+            for i in range(max_iterations):
+                if max_evaluations is not None and self.n_evaluations + \
+                        max(used, self._iteration_evaluations()) > self._evaluation_limit:
+                    reason = 'max_evaluations'
+                    break
+                if max_time is not None and time.perf_counter() - start + duration > max_time:
+                    reason = 'max_time'
+                    break
+                iteration = time.perf_counter()
+                before = self.n_evaluations
+                self.run()
+                used = self.n_evaluations - before - self.stats.get('refine_evaluations', 0)
+                if adaptive is not None:
+                    self.adapt(adaptive)
+                duration = time.perf_counter() - iteration
+                history.append(float(np.ravel(self.pbg_cost)[0]))
+                if cost_tol is not None and history[-1] <= cost_tol:
+                    reason = 'cost_tol'
+                    break
+                if stagnation is not None and len(history) > stagnation and \
+                        history[-1 - stagnation] - history[-1] <= stagnation_tol * abs(history[-1 - stagnation]):
+                    reason = 'stagnation'
+                    break
+        finally:
+            self._evaluation_limit = None
+        return OptimizeResult(np.array(self.pbg_position), float(np.ravel(self.pbg_cost)[0]),
+                              len(history), self.n_evaluations - evaluations,
+                              time.perf_counter() - start, reason, history)
+
+    def _iteration_evaluations(self):
+        """
+        Evaluations of one iteration of the current swarm when no cost comes
+        from the cache and the surrogate skips nothing: the multi-fidelity
+        screening levels, then the promoted particles.
+        """
+        fidelity = getattr(self._fitness, 'fidelity', None)
+        n, total = self.nPop, 0
+        for level in range(len(fidelity['levels']) if fidelity else 0):
+            if n <= 1:
+                break
+            total += n
+            n = max(1, int(np.ceil(fidelity.get('promote', 0.2) * n)))
+        return total + n
+
+    def adapt(self, adaptive):
+        """Adaptive swarm size step of ``optimize``."""
+        if self.stats.get('escape'):
+            n = min(adaptive['max'], int(np.ceil(self.nPop * adaptive['grow'])))
+            if self._evaluation_limit is not None:
+                # the new particles are evaluated right away
+                n = min(n, self.nPop + self._evaluation_limit - self.n_evaluations)
+            self.resize(n)
+            return
+        spread = (self.p_position_.std(axis=0) / (self.upBound[0] - self.lowBound[0])).max()
+        if spread < adaptive['collapse']:
+            self.resize(max(adaptive['min'], int(self.nPop * adaptive['shrink'])))
+
+    def resize(self, n):
+        """
+        Change the swarm size to ``n``: shrinking keeps the particles with the
+        best personal bests, growing adds random particles (evaluated now).
+        """
+        if n < self.nPop:
+            keep = np.sort(np.argsort(self.pb_cost_[:, 0], kind='stable')[:n])
+            for name in ('lowBound', 'upBound', 'p_position_', 'p_velocity_', 'p_cost_',
+                         'pb_position_', 'pb_cost_'):
+                setattr(self, name, getattr(self, name)[keep])
+            self._pb_state = [self._pb_state[i] for i in keep]
+            self.nPop = n
+        elif n > self.nPop:
+            low, up = self.lowBound[:1], self.upBound[:1]
+            new = (up - low) * self.rng.random((n - self.nPop, self.nVar)) + low
+            cost = self._executor.evaluate(new)[0]
+            self.n_evaluations += len(new)
+            if self._surrogate is not None:
+                self._surrogate.add(new, cost)
+            self.lowBound = np.ones([n, self.nVar]) * low
+            self.upBound = np.ones([n, self.nVar]) * up
+            self.p_position_ = np.concatenate([self.p_position_, new])
+            self.p_velocity_ = np.concatenate([self.p_velocity_, np.zeros_like(new)])
+            self.p_cost_ = np.concatenate([self.p_cost_, cost])
+            self.pb_position_ = np.concatenate([self.pb_position_, new])
+            self.pb_cost_ = np.concatenate([self.pb_cost_, cost])
+            self._pb_state += [None] * len(new)
+            self.nPop = n
+            best = int(self.pb_cost_[:, 0].argmin())
+            if self.pb_cost_[best] < self.pbg_cost and self.verify(best):
+                self.pbg_cost = self.pb_cost_[best].copy()
+                self.pbg_position = self.pb_position_[best].copy()
+                self.pbg_y_hat = self._fitness.simulation(self.pbg_position)
+
+    def notify(self, new_global_best=False, escape=False):
+        for observer in self.observers:
+            if new_global_best:
+                observer.on_new_global_best(self, self.stats)
+            if escape:
+                observer.on_escape_reinit(self, self.stats)
+            observer.on_iteration(self, self.stats)
 
 
 
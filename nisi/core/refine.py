@@ -0,0 +1,65 @@
+import numpy as np
+
+
+def levenberg_marquardt(residuals, k0, lowBound, upBound, max_iterations=20, tol=1e-12,
+                        step=1e-6, damping=1e-3, max_evaluations=None):
+    """
+    Bounded Levenberg-Marquardt minimization of the sum of squared
+    ``residuals(k)``, a function mapping a batch (m, nVar) to (m, N).
+
+    The Jacobian is taken by forward finite differences of ``step`` times
+    the bounds range, all nVar + 1 points in one batch. Stops when an
+    accepted step lowers the sum of squares by less than ``tol`` (relative)
+    or when the damping grows past any useful step, or before exceeding
+    ``max_evaluations`` residual evaluations (at least one is made).
+    Returns the solution, its sum of squares, the number of residual
+    evaluations (points) and of iterations.
+    """
+    low, up = np.asarray(lowBound, dtype=float), np.asarray(upBound, dtype=float)
+    k = np.clip(np.asarray(k0, dtype=float), low, up)
+    h = step * (up - low)
+    n_var = len(k)
+    evaluations = 0
+    r = None
+    iterations = 0
+    for iteration in range(max_iterations):
+        if max_evaluations is not None and evaluations + n_var + 2 > max_evaluations:
+            # no room for a Jacobian and a trial step
+            break
+        iterations = iteration + 1
+        # step backwards on the upper bound
+        h_k = np.where(k + h > up, -h, h)
+        points = np.vstack([k, k + np.diag(h_k)])
+        batch = residuals(points)
+        evaluations += n_var + 1
+        r = batch[0]
+        sse = r @ r
+        if not np.isfinite(sse):
+            break
+        J = ((batch[1:] - r) / h_k[:, None]).T
+        finite = np.isfinite(J).all(axis=0)
+        J[:, ~finite] = 0.
+        JtJ = J.T @ J
+        g = J.T @ r
+        while damping < 1e10:
+            if max_evaluations is not None and evaluations >= max_evaluations:
+                return k, sse, evaluations, iteration + 1
+            A = JtJ + damping * np.diag(np.maximum(np.diag(JtJ), 1e-12))
+            trial = np.clip(k - np.linalg.solve(A, g), low, up)
+            r_trial = residuals(trial[None, :])[0]
+            evaluations += 1
+            sse_trial = r_trial @ r_trial
+            if np.isfinite(sse_trial) and sse_trial < sse:
+                damping = max(damping / 10., 1e-12)
+                break
+            damping *= 10.
+        else:
+            return k, sse, evaluations, iteration + 1
+        k, improvement = trial, (sse - sse_trial) / max(sse, 1e-300)
+        r, sse = r_trial, sse_trial
+        if improvement < tol:
+            return k, sse, evaluations, iteration + 1
+    if r is None:
+        r = residuals(k[None, :])[0]
+        evaluations += 1
+    return k, r @ r, evaluations, iterations
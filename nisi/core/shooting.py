@@ -0,0 +1,170 @@
+import hashlib
+
+import numpy as np
+
+
+class MultipleShooting:
+    """
+    Multiple-shooting fitness of a ``Model``: the grid ``t`` is split into
+    ``segments`` integrated independently, each restarted from the observed
+    states at its first sample. Unobserved states at the start of segments
+    1.. are free parameters appended to the unknown constants, so ``PSO``
+    searches ``n_unknown + n_extra`` variables (bounds included)::
+
+        k = [unknowns..., unobserved states of segment 1, of segment 2, ...]
+
+    The loss is the model loss on the stitched trajectory plus ``penalty``
+    times the mean squared mismatch between the end of each segment and the
+    start of the next. With a ``vectorized`` model every segment of every
+    particle goes through a single RK4 loop. The integration runs in the
+    model ``dtype``; ``exact`` re-evaluates in float64.
+    Usable by ``PSO`` wherever a ``Model`` is.
+    """
+    fidelity = None
+    inplace = False
+
+    def __init__(self, model, segments, n_unknown, penalty=1.0):
+        self.model = model
+        self.segments = segments
+        self.n_unknown = n_unknown
+        self.penalty = penalty
+        self.vectorized = model.vectorized
+        self.aborted_steps = 0
+        n = len(model.t)
+        if not 1 <= segments <= n - 1:
+            raise Exception('segments must be between 1 and len(t) - 1')
+        self.bounds = np.linspace(0, n - 1, segments + 1).round().astype(int)
+        self.mask = np.asarray(model.state_mask, dtype=bool)
+        self.n_extra = (segments - 1) * np.count_nonzero(~self.mask)
+
+    @property
+    def y(self):
+        return self.model.y
+
+    @property
+    def t(self):
+        return self.model.t
+
+    @property
+    def state_mask(self):
+        return self.model.state_mask
+
+    @property
+    def unknown_const(self):
+        return self.model.unknown_const
+
+    @property
+    def dtype(self):
+        return self.model.dtype
+
+    def exact(self, k):
+        """Float64 shooting loss of ``k``."""
+        return self.model._float64(lambda k: self.evaluate(k)[0], k)
+
+    def fingerprint(self):
+        h = hashlib.sha1(self.model.fingerprint().encode())
+        h.update(np.array([self.segments, self.n_unknown, self.penalty], dtype=float).tobytes())
+        return h.hexdigest()
+
+    def simulation(self, k):
+        """Single-shooting trajectory of the unknown constants in ``k``."""
+        return self.model.simulation(np.asarray(k)[..., :self.n_unknown])
+
+    def initial_states(self, k):
+        """Start state (nPop, segments, nState) of every segment."""
+        k = np.atleast_2d(k)
+        x0 = np.empty((len(k), self.segments, len(self.model.x0)))
+        x0[:, 0] = self.model.x0
+        x0[:, 1:, self.mask] = self.y[self.bounds[1:-1]][:, self.mask]
+        x0[:, 1:, ~self.mask] = k[:, self.n_unknown:].reshape(len(k), self.segments - 1,
+                                                              np.count_nonzero(~self.mask))
+        return x0
+
+    def evaluate(self, k, threshold=None, level=None):
+        """
+        Shooting loss of ``k``, the observed data and the stitched trajectory.
+        ``threshold`` and ``level`` are accepted for ``PSO`` and ignored.
+        """
+        if self.vectorized:
+            loss, y, y_hat = self.evaluate_batch(np.asarray(k)[None, :])
+            return loss[0], y, y_hat[0]
+        y_hat, ends, x0 = self._integrate(k)
+        return self._loss(y_hat[None], ends[None], x0[None])[0], self.y, y_hat
+
+    def evaluate_batch(self, k, threshold=None, level=None):
+        """
+        Shooting loss (nPop,) of the population ``k`` (nPop, nVar) and the
+        stitched trajectories (nPop, n, nState). Requires a ``vectorized``
+        model.
+        """
+        y_hat, ends, x0 = self._integrate_batch(k)
+        return self._loss(y_hat, ends, x0), self.y, y_hat
+
+    def residuals(self, k):
+        """
+        Residuals (nPop, N + M) of the population ``k`` (nPop, nVar): the
+        prediction errors on the observed states of the stitched trajectory
+        scaled by 1 / sqrt(N), then the continuity mismatches scaled by
+        sqrt(penalty / M). With an mse loss their sum of squares is the
+        shooting loss. Integrated in float64.
+        """
+        return self.model._float64(self._residuals, np.atleast_2d(k))
+
+    def _residuals(self, k):
+        m = self.model
+        if self.vectorized:
+            y_hat, ends, x0 = self._integrate_batch(k)
+        else:
+            y_hat, ends, x0 = (np.stack(a) for a in zip(*[self._integrate(k_i) for k_i in k]))
+        error = (y_hat[..., self.mask] - m.y[:, self.mask]).reshape(len(k), -1)
+        r = [error / np.sqrt(error.shape[1])]
+        if self.segments > 1:
+            mismatch = (ends[:, :-1] - x0[:, 1:]).reshape(len(k), -1)
+            r.append(np.sqrt(self.penalty / mismatch.shape[1]) * mismatch)
+        return np.concatenate(r, axis=1)
+
+    def _integrate(self, k):
+        """Stitched trajectory, segment ends and segment starts of one ``k``."""
+        m = self.model
+        k = np.asarray(k)
+        x0 = self.initial_states(k)[0].astype(m.dtype)
+        m.unknown_const = k[:self.n_unknown].astype(m.dtype)
+        y_hat = np.empty((len(m.t), len(m.x0)), dtype=m.dtype)
+        ends = np.empty((self.segments, len(m.x0)), dtype=m.dtype)
+        for s, (a, b) in enumerate(zip(self.bounds[:-1], self.bounds[1:])):
+            x = m.ode45(m.model, m.t[a:b + 1], x0[s], *m.args)
+            y_hat[a:b + 1] = x
+            ends[s] = x[-1]
+        return y_hat, ends, x0
+
+    def _integrate_batch(self, k):
+        """``_integrate`` of a population, every segment in one RK4 loop."""
+        m = self.model
+        k = np.asarray(k)
+        n_pop, n_seg = len(k), self.segments
+        x0 = self.initial_states(k).astype(m.dtype)
+        steps = np.diff(self.bounds)
+        n_steps = steps.max()
+        t = np.ravel(m.t).astype(m.dtype)
+        dt = t[1] - t[0]
+        # every (particle, segment) pair is a row, each with its own clock
+        m.unknown_const = np.repeat(k[:, :self.n_unknown], n_seg, axis=0).astype(m.dtype)
+        t0 = np.tile(t[self.bounds[:-1]], n_pop)
+        x = np.empty((n_steps + 1, n_pop * n_seg, len(m.x0)), dtype=m.dtype)
+        x[0] = x0.reshape(n_pop * n_seg, -1)
+        for i in range(n_steps):
+            x[i + 1] = m.rk4_step(m.model, x[i], t0 + i * dt, dt, *m.args)
+        # (n_steps + 1, nPop * segments, nState) -> (nPop, segments, n_steps + 1, nState)
+        x = x.reshape(n_steps + 1, n_pop, n_seg, -1).transpose(1, 2, 0, 3)
+        y_hat = np.empty((n_pop, len(t), len(m.x0)), dtype=m.dtype)
+        for s, (a, b) in enumerate(zip(self.bounds[:-1], self.bounds[1:])):
+            y_hat[:, a:b + 1] = x[:, s, :b - a + 1]
+        ends = x[:, np.arange(n_seg), steps]
+        return y_hat, ends, x0
+
+    def _loss(self, y_hat, ends, x0):
+        m = self.model
+        loss = m.loss(m.y[:, self.mask].astype(m.dtype, copy=False), y_hat[..., self.mask])
+        if self.segments > 1:
+            loss = loss + self.penalty * ((ends[:, :-1] - x0[:, 1:])**2).mean(axis=(-2, -1))
+        return loss
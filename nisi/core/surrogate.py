@@ -0,0 +1,84 @@
+import numpy as np
+
+
+class Surrogate:
+    """
+    Cheap cost model fitted on the archive of real (position, cost)
+    evaluations, used to decide which candidates are worth integrating.
+    Positions are scaled to the unit box given by ``lowBound``/``upBound``.
+
+    method: 'knn' (inverse-distance weighted mean of the ``k`` nearest
+        archived costs) or 'rbf' (Gaussian radial basis interpolant of
+        width ``epsilon`` through the ``k`` nearest archived costs, fitted
+        for each candidate). Both cost O(maxsize) per candidate for the
+        neighbour search, plus a k x k solve per candidate for 'rbf'.
+    select: fraction of the candidates with the lowest predicted cost that
+        get a real evaluation.
+    explore: fraction of the remaining candidates evaluated anyway, drawn
+        at random.
+    min_archive: archive size below which every candidate is evaluated.
+    """
+    def __init__(self, lowBound, upBound, method='knn', k=5, maxsize=2000, select=0.3,
+                 explore=0.1, min_archive=None, epsilon=0.2, regularization=1e-8):
+        if method not in ('knn', 'rbf'):
+            raise Exception('Unknown surrogate method: {}'.format(method))
+        self.lowBound = np.asarray(lowBound, dtype=float)
+        self.scale = np.asarray(upBound, dtype=float) - self.lowBound
+        self.method = method
+        self.k = k
+        self.maxsize = maxsize
+        self.select = select
+        self.explore = explore
+        self.min_archive = 2 * k if min_archive is None else min_archive
+        self.epsilon = epsilon
+        self.regularization = regularization
+        self._x = np.empty((0, len(self.lowBound)))
+        self._cost = np.empty(0)
+
+    def __len__(self):
+        return len(self._cost)
+
+    def _scaled(self, positions):
+        return (np.atleast_2d(positions) - self.lowBound) / self.scale
+
+    def add(self, positions, cost):
+        """Archive real evaluations; non-finite costs are ignored."""
+        cost = np.ravel(cost)
+        finite = np.isfinite(cost)
+        self._x = np.concatenate([self._x, self._scaled(positions)[finite]])[-self.maxsize:]
+        self._cost = np.concatenate([self._cost, cost[finite]])[-self.maxsize:]
+
+    def predict(self, positions):
+        x = self._scaled(positions)
+        d2 = ((x[:, None, :] - self._x[None, :, :]) ** 2).sum(-1)
+        k = min(self.k, len(self._cost))
+        nearest = np.argpartition(d2, k - 1, axis=1)[:, :k]
+        d2 = np.take_along_axis(d2, nearest, axis=1)
+        if self.method == 'rbf':
+            # one small interpolant per candidate instead of one over the archive
+            xs = self._x[nearest]
+            phi = np.exp(-((xs[:, :, None, :] - xs[:, None, :, :]) ** 2).sum(-1)
+                         / self.epsilon ** 2)
+            phi += self.regularization * np.eye(k)
+            cost = self._cost[nearest]
+            mean = cost.mean(axis=1)
+            weights = np.linalg.solve(phi, (cost - mean[:, None])[..., None])[..., 0]
+            return (np.exp(-d2 / self.epsilon ** 2) * weights).sum(1) + mean
+        weights = 1. / np.maximum(d2, 1e-300)
+        return (weights * self._cost[nearest]).sum(1) / weights.sum(1)
+
+    def choose(self, positions, rng):
+        """
+        Indices of the candidates ``positions`` to evaluate for real, and the
+        predicted cost of every candidate (None while the archive is small).
+        """
+        n = len(positions)
+        if len(self) < self.min_archive or n == 0:
+            return np.arange(n), None
+        predicted = self.predict(positions)
+        n_select = max(1, int(np.ceil(self.select * n)))
+        order = np.argsort(predicted, kind='stable')
+        rest = order[n_select:]
+        n_explore = int(np.ceil(self.explore * len(rest)))
+        explore = rng.choice(rest, n_explore, replace=False) if n_explore else rest[:0]
+        return np.sort(np.concatenate([order[:n_select], explore])), predicted
@@ -0,0 +1,152 @@
+import json
+import os
+
+import numpy as np
+
+from .executor import Executor
+
+
+class Sweep:
+    """
+    Loss landscape of a fitness over a parameter grid or a Latin-hypercube
+    sample, evaluated chunk by chunk and streamed to memory-mapped ``.npy``
+    files in the directory ``path``:
+
+        cost.npy    loss of every point (grid shaped for a ``grid`` sweep)
+        points.npy  sampled positions (``lhs`` sweeps only)
+        axes.npz    grid axes (``grid`` sweeps only)
+        sweep.json  fitness fingerprint and ``lhs`` arguments
+        done.npy    completed chunks
+
+    An interrupted ``run()`` resumes from the first unfinished chunk when a
+    ``Sweep`` is created again on the same ``path`` with the same arguments;
+    other arguments, or a fitness with another ``fingerprint()``, raise.
+
+    grid: one array of values per unknown constant (full tensor product).
+    lhs: {'n': points, 'lowBound': [...], 'upBound': [...], 'seed': None}.
+    executor, n_workers: spread each chunk as in ``PSO`` (see ``Executor``).
+    """
+    def __init__(self, fitness, path, grid=None, lhs=None, chunksize=10000,
+                 executor='serial', n_workers=None):
+        if (grid is None) == (lhs is None):
+            raise Exception('Please provide either grid or lhs')
+        self.fitness = fitness
+        self.path = path
+        self.chunksize = chunksize
+        os.makedirs(path, exist_ok=True)
+        self._check_spec({'fingerprint': getattr(fitness, 'fingerprint', lambda: '')(),
+                          'lhs': lhs})
+        if grid is not None:
+            self.axes = [np.asarray(a, dtype=float) for a in grid]
+            self._check_axes()
+            shape = tuple(len(a) for a in self.axes)
+            self._points = None
+        else:
+            self.axes = None
+            self._points = self._open('points.npy', (lhs['n'], len(lhs['lowBound'])),
+                                      lambda points: self._latin_hypercube(points, **lhs))
+            shape = (lhs['n'],)
+        self.cost = self._open('cost.npy', shape, lambda cost: cost.fill(np.nan))
+        self.n = self.cost.size
+        self.n_chunks = -(-self.n // chunksize)
+        self.done = self._open('done.npy', (self.n_chunks,), lambda done: done.fill(0), np.bool_)
+        self._executor = Executor(fitness, executor, n_workers)
+
+    def _open(self, name, shape, init, dtype=float):
+        filename = os.path.join(self.path, name)
+        if os.path.exists(filename):
+            array = np.load(filename, mmap_mode='r+')
+            if array.shape != shape:
+                raise Exception(f'{filename} holds another sweep: shape {array.shape} != {shape}')
+            return array
+        array = np.lib.format.open_memmap(filename + '.tmp', mode='w+', dtype=dtype, shape=shape)
+        init(array)
+        array.flush()
+        del array
+        os.replace(filename + '.tmp', filename)
+        return np.load(filename, mmap_mode='r+')
+
+    def _check_spec(self, spec):
+        filename = os.path.join(self.path, 'sweep.json')
+        # compare through JSON so that arrays and lists of the same values match
+        spec = json.loads(json.dumps(spec, default=lambda a: np.asarray(a).tolist()))
+        if os.path.exists(filename):
+            with open(filename, encoding='utf-8') as f:
+                saved = json.load(f)
+            differ = sorted(key for key in spec if saved.get(key) != spec[key])
+            if differ:
+                raise Exception(f'{filename} holds another sweep: {", ".join(differ)} differ')
+            return
+        with open(filename + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(spec, f)
+        os.replace(filename + '.tmp', filename)
+
+    def _check_axes(self):
+        # the shape alone does not tell two grids apart
+        filename = os.path.join(self.path, 'axes.npz')
+        if os.path.exists(filename):
+            with np.load(filename) as saved:
+                axes = [saved[f'axis_{i}'] for i in range(len(saved.files))]
+            if len(axes) != len(self.axes) or \
+                    not all(np.array_equal(a, b) for a, b in zip(axes, self.axes)):
+                raise Exception(f'{filename} holds another sweep: the grid axes differ')
+            return
+        with open(filename + '.tmp', 'wb') as f:
+            np.savez(f, **{f'axis_{i}': a for i, a in enumerate(self.axes)})
+        os.replace(filename + '.tmp', filename)
+
+    @staticmethod
+    def _latin_hypercube(points, n, lowBound, upBound, seed=None):
+        rng = np.random.default_rng(seed)
+        low, up = np.asarray(lowBound, dtype=float), np.asarray(upBound, dtype=float)
+        for j in range(points.shape[1]):
+            # one sample in each of the n strata of every axis
+            points[:, j] = low[j] + (up[j] - low[j]) * (rng.permutation(n) + rng.random(n)) / n
+
+    def points(self, start, stop):
+        """Positions (stop - start, nVar) of the flat point indices ``start:stop``."""
+        if self._points is not None:
+            return np.array(self._points[start:stop])
+        index = np.unravel_index(np.arange(start, stop), self.cost.shape)
+        return np.stack([a[i] for a, i in zip(self.axes, index)], axis=1)
+
+    def run(self, progress=None):
+        """
+        Evaluate every unfinished chunk; ``progress(done, total)`` is called
+        after each one. Returns the (memory-mapped) cost array.
+        """
+        flat = self.cost.reshape(-1)
+        for c in range(self.n_chunks):
+            if self.done[c]:
+                continue
+            start, stop = c * self.chunksize, min((c + 1) * self.chunksize, self.n)
+            flat[start:stop] = self._executor.evaluate(self.points(start, stop))[0][:, 0]
+            self.cost.flush()
+            self.done[c] = True
+            self.done.flush()
+            if progress is not None:
+                progress(int(self.done.sum()), self.n_chunks)
+        return self.cost
+
+    def best(self, n):
+        """Positions (n, nVar) and costs (n,) of the ``n`` lowest evaluated losses."""
+        flat = self.cost.reshape(-1)
+        index, cost = np.empty(0, dtype=int), np.empty(0)
+        for start in range(0, self.n, self.chunksize):
+            chunk = np.array(flat[start:start + self.chunksize])
+            chunk[np.isnan(chunk)] = np.inf
+            index = np.concatenate([index, start + np.arange(len(chunk))])
+            cost = np.concatenate([cost, chunk])
+            keep = np.argsort(cost, kind='stable')[:n]
+            index, cost = index[keep], cost[keep]
+        return np.array([self.points(i, i + 1)[0] for i in index]), cost
+
+    def seed(self, pso, n=None):
+        """Replace the worst particles of ``pso`` by the ``n`` (default nPop) best points."""
+        positions, cost = self.best(pso.nPop if n is None else n)
+        finite = np.isfinite(cost)
+        if finite.any():
+            pso.inject(positions[finite], cost[finite])
+
+    def close(self):
+        self._executor.shutdown()
@@ -12,4 +12,5 @@ setup(
     author='Jeferson Lima',
     author_email='jefersonjl82@gmail.com',
     description='NisI: Non-Ideal System Identification',
+    entry_points={'console_scripts': ['nisi = nisi.cli:main']},
     install_requires = requirements_list)
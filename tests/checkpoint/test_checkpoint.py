@@ -0,0 +1,128 @@
+import numpy as np
+import pytest
+from nisi import PSO, Model
+
+class EqSystem(Model):
+    vectorized = True
+
+    def __init__(self, params=None):
+        super().__init__(params)
+        self._params = params
+
+    def model(self, t, y, *args):
+        k = self.unknown_const
+        alpha = 0.5
+        beta  = 1
+        delta = -1
+        omega = k[..., 0]
+        F     = k[..., 1]
+        dy = np.zeros(np.shape(y))
+        dy[..., 0] = y[..., 1]
+        dy[..., 1] = -alpha*y[..., 1] -delta*y[..., 0] -beta*y[..., 0]**3 + F*np.cos(y[..., 2])
+        dy[..., 2] = omega
+        return dy
+
+@pytest.fixture
+def fixture_sys_a():
+    params = {'optmizer': {'lowBound': [0.1 , 0.1],
+                            'upBound': [5.0,  0.5],
+                            'maxVelocity':  2,
+                            'minVelocity': -2,
+                            'nPop': 10,
+                            'nVar': 2,
+                            'social_weight': 2.0,
+                            'cognitive_weight': 1.0,
+                            'w': 0.9,
+                            'beta': 0.1,
+                            'w_damping': 0.999,
+                            'escape_min_vel_percent': 0.0005,
+                           'escape_min_error': 2e-3,
+                           'seed': 42},
+                'dyn_system': {'model_path': '',
+                                'external': None,
+                                'state_mask' : [True, False, False],
+                               'loss': 'rmse',
+                                'x0': [0., 0., 0.],
+                                't': [0,20,200]
+                                }
+                }
+    return params
+
+def test_resume_is_bit_identical(fixture_sys_a, tmp_path):
+    f_fit = EqSystem(fixture_sys_a)
+    f_fit.y = f_fit.simulation(np.array([1., 0.385]))
+    pso = PSO(f_fit, fixture_sys_a)
+    for i in range(5):
+        pso.run()
+    pso.save_checkpoint(tmp_path / 'pso.npz')
+    for i in range(10):
+        pso.run()
+
+    resumed = PSO(f_fit, fixture_sys_a, checkpoint=tmp_path / 'pso.npz')
+    for i in range(10):
+        resumed.run()
+    for name in ('p_position_', 'p_velocity_', 'pb_position_', 'pb_cost_', 'pbg_position', 'pbg_cost'):
+        assert np.array_equal(getattr(pso, name), getattr(resumed, name))
+    assert pso.w == resumed.w
+
+def test_seed_reproducible(fixture_sys_a):
+    f_fit = EqSystem(fixture_sys_a)
+    f_fit.y = f_fit.simulation(np.array([1., 0.385]))
+    a = PSO(f_fit, fixture_sys_a)
+    b = PSO(f_fit, fixture_sys_a)
+    a.run()
+    b.run()
+    assert np.array_equal(a.p_position_, b.p_position_)
+
+def test_resume_with_surrogate(fixture_sys_a, tmp_path):
+    fixture_sys_a['optmizer']['surrogate'] = {'min_archive': 5}
+    fixture_sys_a['optmizer']['seed'] = 3
+    f_fit = EqSystem(fixture_sys_a)
+    f_fit.y = f_fit.simulation(np.array([1., 0.385]))
+    pso = PSO(f_fit, fixture_sys_a)
+    for i in range(15):
+        pso.run()
+    pso.save_checkpoint(tmp_path / 'pso.npz')
+    for i in range(25):
+        pso.run()
+
+    resumed = PSO(f_fit, fixture_sys_a, checkpoint=tmp_path / 'pso.npz')
+    assert len(resumed._surrogate) > 0
+    for i in range(25):
+        resumed.run()
+    for name in ('p_position_', 'p_velocity_', 'pb_position_', 'pb_cost_', 'pbg_position', 'pbg_cost'):
+        assert np.array_equal(getattr(pso, name), getattr(resumed, name))
+    assert np.array_equal(pso._surrogate._cost, resumed._surrogate._cost)
+
+def test_resume_with_refine(fixture_sys_a, tmp_path):
+    fixture_sys_a['optmizer']['refine'] = {'stagnation': 3, 'max_iterations': 5}
+    f_fit = EqSystem(fixture_sys_a)
+    f_fit.y = f_fit.simulation(np.array([1., 0.385]))
+    # a noise floor keeps the refinement away from round-off level costs
+    f_fit.y = f_fit.y + 0.01 * np.random.default_rng(0).standard_normal(f_fit.y.shape)
+    pso = PSO(f_fit, fixture_sys_a)
+    for i in range(8):
+        pso.save_checkpoint(tmp_path / f'pso-{i}.npz')
+        pso.run()
+    for i in range(8):
+        # every save point, whatever the stagnation count
+        resumed = PSO(f_fit, fixture_sys_a, checkpoint=tmp_path / f'pso-{i}.npz')
+        for j in range(i, 8):
+            resumed.run()
+        assert np.array_equal(pso.p_position_, resumed.p_position_)
+        assert np.array_equal(pso.pbg_cost, resumed.pbg_cost)
+
+def test_resume_with_cache(fixture_sys_a, tmp_path):
+    fixture_sys_a['optmizer']['cache'] = {'tol': 0.05}
+    f_fit = EqSystem(fixture_sys_a)
+    f_fit.y = f_fit.simulation(np.array([1., 0.385]))
+    pso = PSO(f_fit, fixture_sys_a)
+    for i in range(8):
+        pso.save_checkpoint(tmp_path / f'pso-{i}.npz')
+        pso.run()
+    for i in range(8):
+        resumed = PSO(f_fit, fixture_sys_a, checkpoint=tmp_path / f'pso-{i}.npz')
+        for j in range(i, 8):
+            resumed.run()
+        assert np.array_equal(pso.p_position_, resumed.p_position_)
+        assert np.array_equal(pso.pbg_cost, resumed.pbg_cost)
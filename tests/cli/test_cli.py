@@ -0,0 +1,113 @@
+import io
+import json
+
+import numpy as np
+import pytest
+from nisi import EquationModel
+from nisi.cli import collect_jobs, main, run, summary
+
+MODEL = '''
+import numpy as np
+from nisi import Model
+
+class EqSystem(Model):
+    vectorized = True
+
+    def model(self, t, y, *args):
+        k = self.unknown_const
+        dy = np.zeros(np.shape(y))
+        dy[..., 0] = y[..., 1]
+        dy[..., 1] = -0.5*y[..., 1] + y[..., 0] - y[..., 0]**3 + k[..., 1]*np.cos(y[..., 2])
+        dy[..., 2] = k[..., 0]
+        return dy
+'''
+
+EQUATIONS = {'states': ['x', 'v', 'phi'],
+             'unknowns': ['omega', 'F'],
+             'rhs': {'x': 'v', 'v': '-0.5*v + x - x**3 + F*cos(phi)', 'phi': 'omega'}}
+
+@pytest.fixture
+def fixture_jobs(tmp_path):
+    optmizer = {'lowBound': [0.1, 0.1], 'upBound': [5.0, 0.5], 'maxVelocity': 2,
+                'minVelocity': -2, 'nPop': 10, 'nVar': 2, 'social_weight': 2.0,
+                'cognitive_weight': 1.0, 'w': 0.9, 'beta': 0.1, 'w_damping': 0.999,
+                'escape_min_vel_percent': 0.0005, 'escape_min_error': 2e-3, 'seed': 0}
+    dyn_system = {'model_path': 'data.npy', 'external': {'dt': 0.1},
+                  'state_mask': [True, False, False], 'loss': 'rmse',
+                  'x0': [0., 0., 0.], 't': [0, 19.9, 200]}
+    params = {'optmizer': optmizer, 'dyn_system': dict(dyn_system, equations=EQUATIONS)}
+    f_fit = EquationModel(dict(params, dyn_system=dict(params['dyn_system'], model_path='')))
+    np.save(tmp_path / 'data.npy', f_fit.simulation(np.array([1., 0.385]))[:, :1])
+    (tmp_path / 'models.py').write_text(MODEL)
+    jobs = tmp_path / 'jobs'
+    jobs.mkdir()
+    for name, model in (('class', '../models.py:EqSystem'), ('equations', None)):
+        config = {'params': {'optmizer': optmizer,
+                             'dyn_system': dict(dyn_system, model_path='../data.npy')},
+                  'budget': {'max_iterations': 5}}
+        if model is None:
+            config['params']['dyn_system']['equations'] = EQUATIONS
+        else:
+            config['model'] = model
+        (jobs / f'{name}.json').write_text(json.dumps(config))
+    return tmp_path
+
+def test_run_and_skip_completed(fixture_jobs):
+    results = fixture_jobs / 'results'
+    records = run([str(fixture_jobs / 'jobs')], str(results), workers=2)
+    assert sorted(r['name'] for r in records) == ['class', 'equations']
+    assert all(r['status'] == 'completed' for r in records)
+    costs = {r['name']: r['cost'] for r in records}
+    assert np.isclose(costs['class'], costs['equations'])
+    assert all(r['iterations'] == 5 and len(r['history']) == 5 for r in records)
+    assert not run([str(fixture_jobs / 'jobs')], str(results))
+    out = io.StringIO()
+    summary(str(results), out)
+    assert out.getvalue().count('max_iterations') == 2
+
+def test_budget_cap_and_changed_config(fixture_jobs):
+    results = str(fixture_jobs / 'results')
+    jobs = str(fixture_jobs / 'jobs')
+    run([jobs], results, workers=1)
+    config = json.loads((fixture_jobs / 'jobs' / 'class.json').read_text())
+    config['budget']['max_iterations'] = 50
+    (fixture_jobs / 'jobs' / 'class.json').write_text(json.dumps(config))
+    records = run([jobs], results, budget={'max_evaluations': 25})
+    assert [r['name'] for r in records] == ['class']
+    assert records[0]['reason'] == 'max_evaluations'
+    assert records[0]['evaluations'] <= 25
+
+def test_changed_data_and_model_files(fixture_jobs):
+    results = str(fixture_jobs / 'results')
+    jobs = str(fixture_jobs / 'jobs')
+    run([jobs], results, workers=1)
+    data = np.load(fixture_jobs / 'data.npy')
+    np.save(fixture_jobs / 'data.npy', data + 0.01)
+    assert sorted(r['name'] for r in run([jobs], results, workers=1)) == ['class', 'equations']
+    (fixture_jobs / 'models.py').write_text(MODEL + '\n# edited\n')
+    assert [r['name'] for r in run([jobs], results, workers=1)] == ['class']
+    assert not run([jobs], results, workers=1)
+
+def test_manifest_and_failures(fixture_jobs):
+    manifest = {'jobs': ['jobs/class.json',
+                         {'name': 'broken', 'model': 'models.py:Missing',
+                          'params': json.loads((fixture_jobs / 'jobs' / 'class.json')
+                                               .read_text())['params']}]}
+    (fixture_jobs / 'manifest.json').write_text(json.dumps(manifest))
+    assert [j['name'] for j in collect_jobs([str(fixture_jobs / 'manifest.json')])] == \
+        ['class', 'broken']
+    with pytest.raises(SystemExit):
+        main(['run', str(fixture_jobs / 'manifest.json'), '--results',
+              str(fixture_jobs / 'results'), '--workers', '1'])
+    records = run([str(fixture_jobs / 'manifest.json')], str(fixture_jobs / 'results'))
+    assert [r['name'] for r in records] == ['broken']
+    assert 'Missing' in records[0]['error']
+
+def test_yaml_config(fixture_jobs):
+    yaml = pytest.importorskip('yaml')
+    config = json.loads((fixture_jobs / 'jobs' / 'class.json').read_text())
+    (fixture_jobs / 'jobs' / 'class.json').unlink()
+    (fixture_jobs / 'jobs' / 'equations.json').unlink()
+    (fixture_jobs / 'jobs' / 'class.yaml').write_text(yaml.safe_dump(config))
+    records = run([str(fixture_jobs / 'jobs')], str(fixture_jobs / 'results'))
+    assert [r['status'] for r in records] == ['completed']
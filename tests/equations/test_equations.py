@@ -0,0 +1,88 @@
+import pickle
+
+import numpy as np
+import pytest
+from nisi import EquationModel, Model
+
+class EqSystem(Model):
+    vectorized = True
+
+    def __init__(self, params=None):
+        super().__init__(params)
+        self._params = params
+
+    def model(self, t, y, *args):
+        k = self.unknown_const
+        alpha = 0.5
+        beta  = 1
+        delta = -1
+        omega = k[..., 0]
+        F     = k[..., 1]
+        # non-ideal coeff [1]
+        a_0 = 2.0
+        b_0 = 0.01
+        c_0 = 0.0
+
+        dy = np.zeros(np.shape(y))
+        dy[..., 0] = y[..., 1]
+        dy[..., 1] = -alpha*y[..., 1] -delta*y[..., 0] -beta*y[..., 0]**3 + F*np.cos(y[..., 2]  + a_0*np.sin(b_0*y[..., 2]+c_0))
+        dy[..., 2] = omega
+        return dy
+
+@pytest.fixture
+def fixture_sys_a():
+    params = {'dyn_system': {'model_path': '',
+                             'external': None,
+                             'state_mask' : [True, False, False],
+                             'loss': 'rmse',
+                             'x0': [0., 0., 0.],
+                             't': [0,50,500],
+                             'equations': {
+                                 'states': ['x', 'v', 'phi'],
+                                 'unknowns': ['omega', 'F'],
+                                 'constants': {'alpha': 0.5, 'beta': 1, 'delta': -1,
+                                               'a_0': 2.0, 'b_0': 0.01, 'c_0': 0.0},
+                                 'definitions': {'phase': 'phi + a_0*sin(b_0*phi + c_0)'},
+                                 'rhs': {'x': 'v',
+                                         'v': '-alpha*v - delta*x - beta*x**3 + F*cos(phase)',
+                                         'phi': 'omega'}}
+                             }
+              }
+    return params
+
+def test_matches_handwritten(fixture_sys_a):
+    f_ref = EqSystem(fixture_sys_a)
+    f_eq = EquationModel(fixture_sys_a)
+    k = np.array([1., 0.385])
+    assert np.allclose(f_ref.simulation(k), f_eq.simulation(k))
+    f_ref.y = f_eq.y = f_ref.simulation(k)
+    batch = np.array([[1.1, 0.3], [2.5, 0.45]])
+    assert np.allclose(f_ref.evaluate_batch(batch)[0], f_eq.evaluate_batch(batch)[0])
+
+def test_pickle(fixture_sys_a):
+    f_eq = EquationModel(fixture_sys_a)
+    k = np.array([1., 0.385])
+    f_eq.y = f_eq.simulation(k)
+    clone = pickle.loads(pickle.dumps(f_eq))
+    assert clone._kernel is f_eq._kernel
+    assert np.isclose(clone.evaluate(k)[0], 0.)
+
+@pytest.mark.parametrize('rhs', ['v.real', 'open(x)', 'unknown*v', '__import__("os")'])
+def test_rejects_bad_equations(fixture_sys_a, rhs):
+    fixture_sys_a['dyn_system']['equations']['rhs']['v'] = rhs
+    with pytest.raises(ValueError):
+        EquationModel(fixture_sys_a)
+
+def test_fingerprint_covers_equations_and_args(fixture_sys_a):
+    k = np.array([1., 0.385])
+    f_a = EquationModel(fixture_sys_a)
+    f_a.y = f_a.simulation(k)
+    fixture_sys_a['dyn_system']['equations']['constants']['alpha'] = 0.4
+    f_b = EquationModel(fixture_sys_a)
+    f_b.y = f_a.y
+    assert f_a.fingerprint() != f_b.fingerprint()
+    f_c = EquationModel(fixture_sys_a)
+    f_c.y = f_a.y
+    assert f_b.fingerprint() == f_c.fingerprint()
+    f_c.args = (0.5,)
+    assert f_b.fingerprint() != f_c.fingerprint()
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from nisi import PSO, Model
+from nisi.core.cache import EvaluationCache
+
+class EqSystem(Model):
+    vectorized = True
+
+    def __init__(self, params=None):
+        super().__init__(params)
+        self._params = params
+
+    def model(self, t, y, *args):
+        k = self.unknown_const
+        dy = np.zeros(np.shape(y))
+        dy[..., 0] = y[..., 1]
+        dy[..., 1] = -k[..., 1]*y[..., 1] - k[..., 0]*y[..., 0] + 4*np.sin(np.pi*t)
+        return dy
+
+@pytest.fixture
+def fixture_sys_b():
+    params = {'optmizer': {'lowBound': [1.0 , 1.0],
+                            'upBound': [8,  8],
+                            'maxVelocity':  5,
+                            'minVelocity': -5,
+                            'nPop': 10,
+                            'nVar': 2,
+                            'social_weight': 2.0,
+                            'cognitive_weight': 2.0,
+                            'w': 0.9,
+                            'beta': 0.1,
+                            'w_damping': 0.999,
+                            'escape_min_vel_percent': 0.0005,
+                            'escape_min_error': 0.5,
+                            'cache': {'tol': 1e-3, 'maxsize': 1000}},
+                'dyn_system': {'model_path': '',
+                                'external': None,
+                                'state_mask' : [True, True],
+                               'loss': 'rmse',
+                                'x0': [0., 0.],
+                                't': [0,6,300]
+                                }
+                }
+    return params
+
+def test_quantized_lru():
+    cache = EvaluationCache(tol=1e-3, maxsize=2)
+    cache.put(np.array([1., 2.]), 0.5)
+    assert cache.get(np.array([1.0002, 2.])) == 0.5
+    cache.put(np.array([3., 4.]), 1.5)
+    cache.get(np.array([1., 2.]))
+    cache.put(np.array([5., 6.]), 2.5)
+    assert cache.get(np.array([3., 4.])) is None
+    assert cache.get(np.array([1., 2.])) == 0.5
+    assert (cache.hits, cache.misses) == (3, 1)
+
+def test_persistence(tmp_path):
+    path = str(tmp_path / 'cache.npz')
+    cache = EvaluationCache(tol=1e-3, path=path, fingerprint='a')
+    cache.put(np.array([1., 2.]), 0.5)
+    cache.save()
+    assert EvaluationCache(tol=1e-3, path=path, fingerprint='a').get(np.array([1., 2.])) == 0.5
+    assert len(EvaluationCache(tol=1e-3, path=path, fingerprint='b')) == 0
+
+def test_pso_cache(fixture_sys_b):
+    f_fit = EqSystem(fixture_sys_b)
+    f_fit.y = f_fit.simulation(np.array([2.5, 5.1]))
+    pso = PSO(f_fit, fixture_sys_b)
+    pso.p_position_ = pso.pb_position_.copy()
+    pso.update_cost()
+    assert pso.stats['evaluations'] == 0
+    assert pso.stats['cache_hits'] == 10
+    assert np.allclose(pso.pbg_y_hat, f_fit.simulation(pso.pbg_position))
@@ -0,0 +1,107 @@
+import copy
+
+import numpy as np
+import pytest
+from nisi import PSO, Model
+
+class EqSystem(Model):
+    vectorized = True
+
+    def __init__(self, params=None):
+        super().__init__(params)
+        self._params = params
+
+    def model(self, t, y, *args):
+        k = self.unknown_const
+        alpha = 0.5
+        beta  = 1
+        delta = -1
+        omega = k[..., 0]
+        F     = k[..., 1]
+        dy = np.zeros(np.shape(y))
+        dy[..., 0] = y[..., 1]
+        dy[..., 1] = -alpha*y[..., 1] -delta*y[..., 0] -beta*y[..., 0]**3 + F*np.cos(y[..., 2])
+        dy[..., 2] = omega
+        return dy
+
+@pytest.fixture
+def fixture_sys_a():
+    params = {'optmizer': {'lowBound': [0.1 , 0.1],
+                            'upBound': [5.0,  0.5],
+                            'maxVelocity':  2,
+                            'minVelocity': -2,
+                            'nPop': 10,
+                            'nVar': 2,
+                            'social_weight': 2.0,
+                            'cognitive_weight': 1.0,
+                            'w': 0.9,
+                            'beta': 0.1,
+                            'w_damping': 0.999,
+                            'escape_min_vel_percent': 0.0005,
+                           'escape_min_error': 2e-3,
+                           'seed': 42},
+                'dyn_system': {'model_path': '',
+                                'external': None,
+                                'state_mask' : [True, False, False],
+                               'loss': 'rmse',
+                                'x0': [0., 0., 0.],
+                                't': [0,11.9,120]
+                                }
+                }
+    return params
+
+def recording(params):
+    full = copy.deepcopy(params)
+    full['dyn_system']['t'] = [0, 19.9, 200]
+    f_full = EqSystem(full)
+    f_full.y = f_full.simulation(np.array([1., 0.385]))
+    return f_full
+
+@pytest.mark.parametrize('loss', ['rmse', 'mse'])
+def test_extend_matches_full_evaluation(fixture_sys_a, loss):
+    fixture_sys_a['dyn_system']['loss'] = loss
+    f_full = recording(fixture_sys_a)
+    f_fit = EqSystem(fixture_sys_a)
+    f_fit.y = f_full.y[:120]
+    pso = PSO(f_fit, fixture_sys_a)
+    for i in range(5):
+        pso.run()
+    pso.extend(f_full.t[120:, 0], f_full.y[120:])
+    assert pso.stats['resumed'] == pso.nPop
+    assert len(f_fit.t) == 200
+    expected = f_full.evaluate_batch(pso.pb_position_)[0]
+    assert np.allclose(pso.pb_cost_[:, 0], expected)
+    assert pso.pbg_cost == pso.pb_cost_.min()
+    assert np.allclose(pso.pbg_y_hat, f_full.simulation(pso.pbg_position))
+    pso.run()
+    assert pso.pbg_y_hat.shape == (200, 3)
+
+def test_integrate_window_resumes(fixture_sys_a):
+    f_full = recording(fixture_sys_a)
+    k = np.array([[1.2, 0.3], [0.9, 0.4]])
+    sse, x = f_full.integrate_window(k, np.zeros((2, 3)), 0)
+    assert np.allclose(x[:, 0], f_full.simulation(k[0]))
+    f_part = EqSystem(fixture_sys_a)
+    f_part.y = f_full.y[:120]
+    head, x_head = f_part.integrate_window(k, np.zeros((2, 3)), 0)
+    f_part.extend(f_full.t[120:, 0], f_full.y[120:])
+    tail, x_tail = f_part.integrate_window(k, x_head[-1], 119)
+    assert np.allclose(head + tail, sse)
+    assert np.allclose(x_tail[-1], x[-1])
+
+def test_extend_recomputes_unknown_states(fixture_sys_a):
+    fixture_sys_a['optmizer']['cache'] = {'tol': 1e-8}
+    f_full = recording(fixture_sys_a)
+    f_fit = EqSystem(fixture_sys_a)
+    f_fit.y = f_full.y[:120]
+    pso = PSO(f_fit, fixture_sys_a)
+    pso.run()
+    # injected particles come without a trajectory
+    k = np.array([[1.1, 0.35]])
+    pso.inject(k, f_fit.evaluate_batch(k)[0])
+    evaluations = pso.n_evaluations
+    pso.extend(f_full.t[120:, 0], f_full.y[120:])
+    assert pso.stats['recomputed'] == 1
+    assert pso.n_evaluations == evaluations + pso.stats['recomputed']
+    assert np.allclose(pso.pb_cost_[:, 0], f_full.evaluate_batch(pso.pb_position_)[0])
+    assert len(pso._cache) == 0
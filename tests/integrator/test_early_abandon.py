@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from nisi import PSO, Model
+
+class EqSystem(Model):
+    vectorized = True
+
+    def __init__(self, params=None):
+        super().__init__(params)
+        self._params = params
+
+    def model(self, t, y, *args):
+        k = self.unknown_const
+        alpha = 0.5
+        beta  = 1
+        delta = -1
+        omega = k[..., 0]
+        F     = k[..., 1]
+        dy = np.zeros(np.shape(y))
+        dy[..., 0] = y[..., 1]
+        dy[..., 1] = -alpha*y[..., 1] -delta*y[..., 0] -beta*y[..., 0]**3 + F*np.cos(y[..., 2])
+        dy[..., 2] = omega
+        return dy
+
+@pytest.fixture
+def fixture_sys_a():
+    params = {'optmizer': {'lowBound': [0.1 , 0.1],
+                            'upBound': [5.0,  0.5],
+                            'maxVelocity':  2,
+                            'minVelocity': -2,
+                            'nPop': 10,
+                            'nVar': 2,
+                            'social_weight': 2.0,
+                            'cognitive_weight': 1.0,
+                            'w': 0.9,
+                            'beta': 0.1,
+                            'w_damping': 0.999,
+                            'escape_min_vel_percent': 0.0005,
+                           'escape_min_error': 2e-3,
+                           'early_abandon': True,
+                           'seed': 1},
+                'dyn_system': {'model_path': '',
+                                'external': None,
+                                'state_mask' : [True, False, False],
+                               'loss': 'rmse',
+                                'x0': [0., 0., 0.],
+                                't': [0,50,500]
+                                }
+                }
+    return params
+
+def test_bounded_matches_full(fixture_sys_a):
+    f_fit = EqSystem(fixture_sys_a)
+    f_fit.y = f_fit.simulation(np.array([1., 0.385]))
+    k = np.array([[1.1, 0.3], [2.5, 0.45]])
+    loss, _, _ = f_fit.evaluate_batch(k)
+    bounded, _, _ = f_fit.evaluate_batch(k, np.array([np.inf, np.inf]))
+    assert np.allclose(loss, bounded)
+    assert f_fit.aborted_steps == 0
+    single, _, _ = f_fit.evaluate(k[0], np.inf)
+    assert np.isclose(single, loss[0])
+
+def test_abandon_below_threshold(fixture_sys_a):
+    f_fit = EqSystem(fixture_sys_a)
+    f_fit.y = f_fit.simulation(np.array([1., 0.385]))
+    k = np.array([[1., 0.385], [2.5, 0.45]])
+    loss, _, _ = f_fit.evaluate_batch(k, np.array([1e-3, 1e-3]))
+    assert loss[0] < 1e-3
+    assert np.isinf(loss[1])
+    assert f_fit.aborted_steps > 0
+
+def test_pso_reports_saved_steps(fixture_sys_a):
+    f_fit = EqSystem(fixture_sys_a)
+    f_fit.y = f_fit.simulation(np.array([1., 0.385]))
+    pso = PSO(f_fit, fixture_sys_a)
+    saved = 0
+    for i in range(5):
+        pso.run()
+        saved += pso.stats['steps_saved']
+    assert saved > 0
+    assert np.isfinite(pso.pb_cost_).all()
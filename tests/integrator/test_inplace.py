@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from nisi import Model
+
+class EqSystem(Model):
+    vectorized = True
+
+    def __init__(self, params=None):
+        super().__init__(params)
+        self._params = params
+
+    def model(self, t, y, *args, out=None):
+        k = self.unknown_const
+        ks   = k[..., 0]
+        c    = k[..., 1]
+        w    = 0.5
+        m    = 1
+        wn   = np.sqrt(ks/m)
+        zeta = c/(2*m*wn)
+        dy = np.zeros(np.shape(y)) if out is None else out
+        dy[..., 0] = y[..., 1]
+        dy[..., 1] = -2 * zeta * wn * y[..., 1] - wn ** 2 * y[..., 0] + 4*np.sin(2*np.pi*w*t)
+        return dy
+
+class InplaceEqSystem(EqSystem):
+    inplace = True
+
+@pytest.fixture
+def fixture_sys_b():
+    params = {'dyn_system': {'model_path': '',
+                             'external': None,
+                             'state_mask' : [True, True],
+                             'loss': 'rmse',
+                             'x0': [0., 0.],
+                             't': [0,6,1000]
+                             }
+              }
+    return params
+
+def test_inplace_matches_allocating(fixture_sys_b):
+    f_ref = EqSystem(fixture_sys_b)
+    f_fit = InplaceEqSystem(fixture_sys_b)
+    k = np.array([2.5, 5.1])
+    f_ref.y = f_ref.simulation(k)
+    f_fit.y = f_fit.simulation(k)
+    assert np.allclose(f_ref.y, f_fit.y)
+    for k in (np.array([2., 4.]), np.array([[2., 4.], [3., 6.]])):
+        evaluate = f_ref.evaluate if k.ndim == 1 else f_ref.evaluate_batch
+        loss_ref, _, y_hat_ref = evaluate(k)
+        evaluate = f_fit.evaluate if k.ndim == 1 else f_fit.evaluate_batch
+        loss, _, y_hat = evaluate(k)
+        assert np.allclose(loss, loss_ref)
+        assert np.allclose(y_hat, y_hat_ref)
+
+def test_trajectory_buffer_reused(fixture_sys_b):
+    f_fit = InplaceEqSystem(fixture_sys_b)
+    f_fit.y = f_fit.simulation(np.array([2.5, 5.1]))
+    _, _, y_hat_a = f_fit.evaluate(np.array([2., 4.]))
+    _, _, y_hat_b = f_fit.evaluate(np.array([3., 6.]))
+    assert y_hat_a is y_hat_b
+    assert not np.shares_memory(f_fit.y, y_hat_b)
+
+def test_buffers_bounded(fixture_sys_b):
+    f_fit = InplaceEqSystem(fixture_sys_b)
+    f_fit.y = f_fit.simulation(np.array([2.5, 5.1]))
+    for n in range(1, 10):
+        f_fit.evaluate_batch(np.tile([2., 4.], (n, 1)))
+    assert len(f_fit._buffers) == f_fit.max_buffers
+    # the most recent batch sizes are kept
+    assert (len(f_fit.t), 9, 2, '<f8') in f_fit._buffers
+    assert (len(f_fit.t), 1, 2, '<f8') not in f_fit._buffers
@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+from nisi import PSO, Model, IslandModel
+
+class EqSystem(Model):
+    vectorized = True
+
+    def __init__(self, params=None):
+        super().__init__(params)
+        self._params = params
+
+    def model(self, t, y, *args):
+        k = self.unknown_const
+        alpha = 0.5
+        beta  = 1
+        delta = -1
+        omega = k[..., 0]
+        F     = k[..., 1]
+        dy = np.zeros(np.shape(y))
+        dy[..., 0] = y[..., 1]
+        dy[..., 1] = -alpha*y[..., 1] -delta*y[..., 0] -beta*y[..., 0]**3 + F*np.cos(y[..., 2])
+        dy[..., 2] = omega
+        return dy
+
+@pytest.fixture
+def fixture_sys_a():
+    params = {'optmizer': {'lowBound': [0.1 , 0.1],
+                            'upBound': [5.0,  0.5],
+                            'maxVelocity':  2,
+                            'minVelocity': -2,
+                            'nPop': 10,
+                            'nVar': 2,
+                            'social_weight': 2.0,
+                            'cognitive_weight': 1.0,
+                            'w': 0.9,
+                            'beta': 0.1,
+                            'w_damping': 0.999,
+                            'escape_min_vel_percent': 0.0005,
+                           'escape_min_error': 2e-3,
+                           'seed': 42},
+                'dyn_system': {'model_path': '',
+                                'external': None,
+                                'state_mask' : [True, False, False],
+                               'loss': 'rmse',
+                                'x0': [0., 0., 0.],
+                                't': [0,20,200]
+                                }
+                }
+    return params
+
+def test_inject_replaces_worst(fixture_sys_a):
+    f_fit = EqSystem(fixture_sys_a)
+    f_fit.y = f_fit.simulation(np.array([1., 0.385]))
+    pso = PSO(f_fit, fixture_sys_a)
+    worst = pso.pb_cost_[:, 0].argmax()
+    pso.inject(np.array([[1., 0.385]]))
+    assert np.allclose(pso.pb_position_[worst], [1., 0.385])
+    assert pso.pbg_cost < 1e-8
+    assert np.allclose(pso.pbg_position, [1., 0.385])
+
+def test_migration_serial(fixture_sys_a):
+    f_fit = EqSystem(fixture_sys_a)
+    f_fit.y = f_fit.simulation(np.array([1., 0.385]))
+    islands = IslandModel(f_fit, fixture_sys_a, islands=[{}, {'w': 0.5}, {}], interval=3,
+                          n_migrants=1, processes=False)
+    islands.run(3)
+    reported = islands.island_costs.copy()
+    # after a ring migration every island holds its neighbour's best
+    for i, island in enumerate(islands._islands):
+        assert np.ravel(island.pso.pbg_cost)[0] <= reported[i - 1]
+    cost, position = islands.run(4)
+    assert islands.iteration == 7
+    assert cost == islands.island_costs.min()
+    assert islands._islands[1].pso.w < islands._islands[0].pso.w
+    assert islands.pbg_y_hat.shape == f_fit.y.shape
+    islands.close()
+
+def test_processes_match_serial(fixture_sys_a):
+    f_fit = EqSystem(fixture_sys_a)
+    f_fit.y = f_fit.simulation(np.array([1., 0.385]))
+    serial = IslandModel(f_fit, fixture_sys_a, islands=2, interval=2, topology='full',
+                         processes=False)
+    remote = IslandModel(f_fit, fixture_sys_a, islands=2, interval=2, topology='full')
+    try:
+        assert serial.run(5)[0] == remote.run(5)[0]
+        assert np.array_equal(serial.pbg_position, remote.pbg_position)
+        assert serial.n_evaluations == remote.n_evaluations
+    finally:
+        serial.close()
+        remote.close()
+
+def test_islands_with_process_executor(fixture_sys_a):
+    fixture_sys_a['optmizer']['executor'] = 'process'
+    fixture_sys_a['optmizer']['n_workers'] = 2
+    f_fit = EqSystem(fixture_sys_a)
+    f_fit.y = f_fit.simulation(np.array([1., 0.385]))
+    islands = IslandModel(f_fit, fixture_sys_a, islands=2, interval=2)
+    try:
+        cost, _ = islands.run(4)
+    finally:
+        islands.close()
+    assert np.isfinite(cost)
+
+def test_island_error_reaches_caller(fixture_sys_a):
+    f_fit = EqSystem(fixture_sys_a)
+    f_fit.y = f_fit.simulation(np.array([1., 0.385]))
+    islands = IslandModel(f_fit, fixture_sys_a, islands=[{}, {'executor': 'unknown'}])
+    try:
+        with pytest.raises(Exception, match='Unknown executor'):
+            islands.run(2)
+    finally:
+        islands.close()
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from nisi import PSO, Model, LiveMonitor
+
+class EqSystem(Model):
+    vectorized = True
+
+    def __init__(self, params=None):
+        super().__init__(params)
+        self._params = params
+
+    def model(self, t, y, *args):
+        k = self.unknown_const
+        dy = np.zeros(np.shape(y))
+        dy[..., 0] = y[..., 1]
+        dy[..., 1] = -k[..., 1]*y[..., 1] - k[..., 0]*y[..., 0] + 4*np.sin(np.pi*t)
+        return dy
+
+@pytest.fixture
+def fixture_sys_b():
+    params = {'optmizer': {'lowBound': [1.0 , 1.0],
+                            'upBound': [8,  8],
+                            'maxVelocity':  5,
+                            'minVelocity': -5,
+                            'nPop': 10,
+                            'nVar': 2,
+                            'social_weight': 2.0,
+                            'cognitive_weight': 2.0,
+                            'w': 0.9,
+                            'beta': 0.1,
+                            'w_damping': 0.999,
+                            'escape_min_vel_percent': 0.0005,
+                            'escape_min_error': 0.5},
+                'dyn_system': {'model_path': '',
+                                'external': None,
+                                'state_mask' : [True, True],
+                               'loss': 'rmse',
+                                'x0': [0., 0.],
+                                't': [0,6,300]
+                                }
+                }
+    return params
+
+def test_headless_frames(fixture_sys_b, tmp_path):
+    pytest.importorskip('matplotlib')
+    f_fit = EqSystem(fixture_sys_b)
+    k = np.array([2.5, 5.1])
+    f_fit.y = f_fit.simulation(k)
+    pso = PSO(f_fit, fixture_sys_b)
+    monitor = LiveMonitor(fps=20, frames_dir=str(tmp_path), lowBound=[1.0, 1.0],
+                          upBound=[8, 8], reference=k)
+    pso.add_observer(monitor)
+    for i in range(30):
+        pso.run()
+    monitor.close(timeout=30)
+    assert not monitor._process.is_alive()
+    assert len(list(tmp_path.glob('frame_*.png'))) >= 1
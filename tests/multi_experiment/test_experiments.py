@@ -0,0 +1,91 @@
+import copy
+
+import numpy as np
+import pytest
+from nisi import PSO, Model, MultiExperiment
+
+class EqSystem(Model):
+    vectorized = True
+    inplace = True
+
+    def __init__(self, params=None):
+        super().__init__(params)
+        self._params = params
+
+    def model(self, t, y, *args, out=None):
+        k = self.unknown_const
+        F = args[0]
+        dy = np.zeros(np.shape(y)) if out is None else out
+        dy[..., 0] = y[..., 1]
+        dy[..., 1] = -k[..., 1]*y[..., 1] - k[..., 0]*y[..., 0] + F*np.sin(np.pi*t)
+        return dy
+
+@pytest.fixture
+def fixture_sys_b():
+    params = {'optmizer': {'lowBound': [1.0 , 1.0],
+                            'upBound': [8,  8],
+                            'maxVelocity':  5,
+                            'minVelocity': -5,
+                            'nPop': 10,
+                            'nVar': 2,
+                            'social_weight': 2.0,
+                            'cognitive_weight': 2.0,
+                            'w': 0.9,
+                            'beta': 0.1,
+                            'w_damping': 0.999,
+                            'escape_min_vel_percent': 0.0005,
+                            'escape_min_error': 0.5,
+                            'seed': 0},
+                'dyn_system': {'model_path': '',
+                                'external': None,
+                                'state_mask' : [True, False],
+                               'loss': 'rmse',
+                                'x0': [0., 0.],
+                                't': [0,6,300],
+                                'args': [4.0]
+                                }
+                }
+    return params
+
+@pytest.fixture
+def experiments(fixture_sys_b):
+    k = np.array([2.5, 5.1])
+    models = []
+    for x0, F, t in (([0., 0.], 4.0, [0, 6, 300]), ([1., 0.], 2.0, [0, 6, 300]),
+                     ([0., 1.], 3.0, [0, 4, 200])):
+        params = copy.deepcopy(fixture_sys_b)
+        params['dyn_system'].update(x0=x0, args=[F], t=t)
+        m = EqSystem(params)
+        m.y = m.simulation(k)
+        models.append(m)
+    return models
+
+def test_weighted_loss(experiments):
+    fitness = MultiExperiment(experiments, weights=[1., 2., 1.])
+    assert [len(g) for g in fitness._groups] == [2, 1]
+    k = np.array([[2., 4.], [3., 6.]])
+    loss, _, y_hat = fitness.evaluate_batch(k)
+    for i in range(len(k)):
+        expected = [m.evaluate(k[i])[0] for m in experiments]
+        assert np.isclose(loss[i], np.average(expected, weights=[1., 2., 1.]))
+        for m, y in zip(experiments, y_hat[i]):
+            assert np.allclose(y, m.simulation(k[i]))
+
+def test_trajectories_survive_next_evaluation(experiments):
+    fitness = MultiExperiment(experiments)
+    k = np.array([[2., 4.], [3., 6.]])
+    _, _, y_hat = fitness.evaluate_batch(k)
+    _, _, y_single = fitness.evaluate(np.array([5., 2.]))
+    fitness.evaluate_batch(np.array([[6., 7.], [7., 3.]]))
+    for i in range(len(k)):
+        for m, y in zip(experiments, y_hat[i]):
+            assert np.allclose(y, m.simulation(k[i]))
+    for m, y in zip(experiments, y_single):
+        assert np.allclose(y, m.simulation(np.array([5., 2.])))
+
+def test_pso_multi_experiment(experiments, fixture_sys_b):
+    pso = PSO(MultiExperiment(experiments), fixture_sys_b)
+    for i in range(5):
+        pso.run()
+    assert len(pso.pbg_y_hat) == 3
+    assert np.isfinite(pso.pbg_cost)
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from nisi import PSO, Model
+
+class EqSystem(Model):
+    vectorized = True
+
+    def __init__(self, params=None):
+        super().__init__(params)
+        self._params = params
+
+    def model(self, t, y, *args):
+        k = self.unknown_const
+        dy = np.zeros(np.shape(y))
+        dy[..., 0] = y[..., 1]
+        dy[..., 1] = -k[..., 1]*y[..., 1] - k[..., 0]*y[..., 0] + 4*np.sin(np.pi*t)
+        return dy
+
+@pytest.fixture
+def fixture_sys_b():
+    params = {'optmizer': {'lowBound': [1.0 , 1.0],
+                            'upBound': [8,  8],
+                            'maxVelocity':  5,
+                            'minVelocity': -5,
+                            'nPop': 20,
+                            'nVar': 2,
+                            'social_weight': 2.0,
+                            'cognitive_weight': 2.0,
+                            'w': 0.9,
+                            'beta': 0.1,
+                            'w_damping': 0.999,
+                            'escape_min_vel_percent': 0.0005,
+                            'escape_min_error': 0.5},
+                'dyn_system': {'model_path': '',
+                                'external': None,
+                                'state_mask' : [True, False],
+                               'loss': 'rmse',
+                                'x0': [0., 0.],
+                                't': [0,6,601],
+                                'fidelity': {'levels': [{'stride': 10, 'horizon': 0.5},
+                                                        {'stride': 4}],
+                                             'promote': 0.5}
+                                }
+                }
+    return params
+
+def test_fidelity_index(fixture_sys_b):
+    f_fit = EqSystem(fixture_sys_b)
+    assert np.array_equal(f_fit.fidelity_index(0), np.arange(0, 301, 10))
+    assert np.array_equal(f_fit.fidelity_index(1), np.arange(0, 601, 4))
+
+def test_pso_screening(fixture_sys_b):
+    f_fit = EqSystem(fixture_sys_b)
+    f_fit.y = f_fit.simulation(np.array([2.5, 5.1]))
+    pso = PSO(f_fit, fixture_sys_b)
+    pso.run()
+    assert pso.stats['screened'] == 20 + 10
+    assert pso.stats['evaluations'] == 20 + 10 + 5
+    assert pso.n_evaluations == 2 * (20 + 10 + 5)
+    assert 0 < pso.stats['time_screening'] < pso.stats['time_evaluation']
+    assert np.isinf(pso.p_cost_).sum() == 15
+    assert np.isfinite(pso.pbg_cost)
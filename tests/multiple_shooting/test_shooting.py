@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+from nisi import PSO, Model, MultipleShooting
+
+class EqSystem(Model):
+    vectorized = True
+
+    def __init__(self, params=None):
+        super().__init__(params)
+        self._params = params
+
+    def model(self, t, y, *args):
+        k = self.unknown_const
+        alpha = 0.5
+        beta  = 1
+        delta = -1
+        omega = k[..., 0]
+        F     = k[..., 1]
+        dy = np.zeros(np.shape(y))
+        dy[..., 0] = y[..., 1]
+        dy[..., 1] = -alpha*y[..., 1] -delta*y[..., 0] -beta*y[..., 0]**3 + F*np.cos(y[..., 2])
+        dy[..., 2] = omega
+        return dy
+
+@pytest.fixture
+def fixture_sys_a():
+    params = {'optmizer': {'lowBound': [0.1 , 0.1],
+                            'upBound': [5.0,  0.5],
+                            'maxVelocity':  2,
+                            'minVelocity': -2,
+                            'nPop': 10,
+                            'nVar': 2,
+                            'social_weight': 2.0,
+                            'cognitive_weight': 1.0,
+                            'w': 0.9,
+                            'beta': 0.1,
+                            'w_damping': 0.999,
+                            'escape_min_vel_percent': 0.0005,
+                           'escape_min_error': 2e-3,
+                           'seed': 42},
+                'dyn_system': {'model_path': '',
+                                'external': None,
+                                'state_mask' : [True, False, False],
+                               'loss': 'rmse',
+                                'x0': [0., 0., 0.],
+                                't': [0,20,200]
+                                }
+                }
+    return params
+
+class ScalarSystem(EqSystem):
+    vectorized = False
+
+def truth(f_fit, shooting):
+    """True parameters followed by the true unobserved segment starts."""
+    k = np.array([1., 0.385])
+    y = f_fit.simulation(k)
+    starts = y[shooting.bounds[1:-1]][:, ~shooting.mask]
+    return np.concatenate([k, starts.ravel()]), y
+
+def test_exact_parameters_have_zero_cost(fixture_sys_a):
+    f_fit = EqSystem(fixture_sys_a)
+    shooting = MultipleShooting(f_fit, segments=4, n_unknown=2)
+    k, f_fit.y = truth(f_fit, shooting)
+    assert shooting.n_extra == 6
+    loss, _, y_hat = shooting.evaluate(k)
+    assert loss < 1e-12
+    assert np.allclose(y_hat, f_fit.y)
+
+def test_single_segment_is_single_shooting(fixture_sys_a):
+    f_fit = EqSystem(fixture_sys_a)
+    f_fit.y = f_fit.simulation(np.array([1., 0.385]))
+    shooting = MultipleShooting(f_fit, segments=1, n_unknown=2)
+    k = np.array([[1.2, 0.3], [0.8, 0.4]])
+    assert np.allclose(shooting.evaluate_batch(k)[0], f_fit.evaluate_batch(k)[0])
+
+def test_batch_matches_loop(fixture_sys_a):
+    f_fit = EqSystem(fixture_sys_a)
+    f_scalar = ScalarSystem(fixture_sys_a)
+    batch = MultipleShooting(f_fit, segments=3, n_unknown=2, penalty=0.5)
+    loop = MultipleShooting(f_scalar, segments=3, n_unknown=2, penalty=0.5)
+    k, y = truth(f_fit, batch)
+    f_fit.y = f_scalar.y = y
+    rng = np.random.default_rng(0)
+    ks = k + 0.05 * rng.standard_normal((4, len(k)))
+    loss, _, y_hat = batch.evaluate_batch(ks)
+    for i in range(len(ks)):
+        loss_i, _, y_i = loop.evaluate(ks[i])
+        assert np.isclose(loss[i], loss_i)
+        assert np.allclose(y_hat[i], y_i)
+
+def test_pso_on_shooting_fitness(fixture_sys_a):
+    f_fit = EqSystem(fixture_sys_a)
+    shooting = MultipleShooting(f_fit, segments=4, n_unknown=2)
+    k, f_fit.y = truth(f_fit, shooting)
+    lo = np.min(f_fit.y[:, 1:], axis=0) - 1
+    hi = np.max(f_fit.y[:, 1:], axis=0) + 1
+    params = fixture_sys_a['optmizer']
+    params['nVar'] = 2 + shooting.n_extra
+    params['lowBound'] = params['lowBound'] + list(np.tile(lo, 3))
+    params['upBound'] = params['upBound'] + list(np.tile(hi, 3))
+    pso = PSO(shooting, fixture_sys_a)
+    pso.run()
+    assert np.isfinite(pso.pbg_cost)
+    assert pso.pbg_position.shape == (8,)
+    assert pso.pbg_y_hat.shape == f_fit.y.shape
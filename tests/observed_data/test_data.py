@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from nisi import Model
+from nisi.core.data import ObservedData
+
+class EqSystem(Model):
+    def __init__(self, params=None):
+        super().__init__(params)
+        self._params = params
+
+    def model(self, t, y, *args):
+        k = self.unknown_const
+        dy = np.zeros(np.shape(y))
+        dy[..., 0] = y[..., 1]
+        dy[..., 1] = -k[..., 1]*y[..., 1] - k[..., 0]*y[..., 0] + 4*np.sin(np.pi*t)
+        return dy
+
+@pytest.fixture
+def recording():
+    # 10x oversampled recording with time in the last column
+    t = np.linspace(0, 6, 3001)
+    return np.column_stack([np.sin(t), np.cos(t), t])
+
+@pytest.fixture
+def fixture_sys_b():
+    params = {'dyn_system': {'model_path': '',
+                             'external': None,
+                             'state_mask' : [True, False],
+                             'loss': 'rmse',
+                             'x0': [0., 0.],
+                             't': [0,6,301]
+                             }
+              }
+    return params
+
+def test_npy_time_column(recording, fixture_sys_b, tmp_path):
+    np.save(tmp_path / 'rec.npy', recording)
+    fixture_sys_b['dyn_system']['model_path'] = str(tmp_path / 'rec.npy')
+    fixture_sys_b['dyn_system']['external'] = {'time_column': 2, 'state_columns': [0, 1],
+                                               'chunksize': 777}
+    f_fit = EqSystem(fixture_sys_b)
+    assert f_fit._y is None
+    t = f_fit.t[:, 0]
+    assert np.allclose(f_fit.y[:, 0], np.sin(t))
+    assert np.isnan(f_fit.y[:, 1]).all()
+
+def test_raw_uniform(recording, fixture_sys_b, tmp_path):
+    recording[:, :2].tofile(tmp_path / 'rec.bin')
+    fixture_sys_b['dyn_system']['model_path'] = str(tmp_path / 'rec.bin')
+    fixture_sys_b['dyn_system']['external'] = {'columns': 2, 'chunksize': 500}
+    f_fit = EqSystem(fixture_sys_b)
+    assert np.allclose(f_fit.y[:, 0], np.sin(f_fit.t[:, 0]))
+
+def test_csv_chunks(recording, tmp_path):
+    np.savetxt(tmp_path / 'rec.csv', recording, delimiter=',', header='x,v,t')
+    data = ObservedData(str(tmp_path / 'rec.csv'), [False, True], time_column=2,
+                        state_columns=[0, 1], chunksize=100, skiprows=1)
+    t = np.linspace(0.5, 7, 50)
+    y = data.resample(t)
+    assert np.allclose(y[t <= 6, 1], np.cos(t[t <= 6]))
+    assert np.allclose(y[t > 6, 1], np.cos(6))
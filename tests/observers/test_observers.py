@@ -0,0 +1,83 @@
+import json
+
+import numpy as np
+import pytest
+from nisi import PSO, Model, Observer, JsonlEventSink
+
+class EqSystem(Model):
+    vectorized = True
+
+    def __init__(self, params=None):
+        super().__init__(params)
+        self._params = params
+
+    def model(self, t, y, *args):
+        k = self.unknown_const
+        dy = np.zeros(np.shape(y))
+        dy[..., 0] = y[..., 1]
+        dy[..., 1] = -k[..., 1]*y[..., 1] - k[..., 0]*y[..., 0] + 4*np.sin(np.pi*t)
+        return dy
+
+@pytest.fixture
+def fixture_sys_b():
+    params = {'optmizer': {'lowBound': [1.0 , 1.0],
+                            'upBound': [8,  8],
+                            'maxVelocity':  5,
+                            'minVelocity': -5,
+                            'nPop': 10,
+                            'nVar': 2,
+                            'social_weight': 2.0,
+                            'cognitive_weight': 2.0,
+                            'w': 0.9,
+                            'beta': 0.1,
+                            'w_damping': 0.999,
+                            'escape_min_vel_percent': 1.0,
+                            'escape_min_error': 0.0,
+                            'seed': 3},
+                'dyn_system': {'model_path': '',
+                                'external': None,
+                                'state_mask' : [True, False],
+                               'loss': 'rmse',
+                                'x0': [0., 0.],
+                                't': [0,6,300]
+                                }
+                }
+    return params
+
+class Recorder(Observer):
+    def __init__(self):
+        self.events = []
+
+    def on_iteration(self, pso, stats):
+        self.events.append(('iteration', dict(stats)))
+
+    def on_new_global_best(self, pso, stats):
+        self.events.append(('new_global_best', dict(stats)))
+
+    def on_escape_reinit(self, pso, stats):
+        self.events.append(('escape_reinit', dict(stats)))
+
+def test_events(fixture_sys_b, tmp_path):
+    f_fit = EqSystem(fixture_sys_b)
+    f_fit.y = f_fit.simulation(np.array([2.5, 5.1]))
+    pso = PSO(f_fit, fixture_sys_b)
+    recorder = Recorder()
+    sink = JsonlEventSink(tmp_path / 'events.jsonl')
+    pso.add_observer(recorder)
+    pso.add_observer(sink)
+    for i in range(20):
+        pso.run()
+    sink.close()
+
+    names = [name for name, _ in recorder.events]
+    assert names.count('iteration') == 20
+    assert 'new_global_best' in names
+    assert 'escape_reinit' in names
+    stats = recorder.events[-1][1]
+    assert stats['iteration'] == 20
+    assert stats['total_evaluations'] == 10 * 21
+    for key in ('time_velocity', 'time_evaluation', 'time_bookkeeping'):
+        assert stats[key] >= 0
+    with open(tmp_path / 'events.jsonl') as f:
+        lines = [json.loads(line) for line in f]
+    assert [line['event'] for line in lines] == names
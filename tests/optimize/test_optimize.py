@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+from nisi import PSO, Model
+
+class EqSystem(Model):
+    vectorized = True
+
+    def __init__(self, params=None):
+        super().__init__(params)
+        self._params = params
+
+    def model(self, t, y, *args):
+        k = self.unknown_const
+        alpha = 0.5
+        beta  = 1
+        delta = -1
+        omega = k[..., 0]
+        F     = k[..., 1]
+        dy = np.zeros(np.shape(y))
+        dy[..., 0] = y[..., 1]
+        dy[..., 1] = -alpha*y[..., 1] -delta*y[..., 0] -beta*y[..., 0]**3 + F*np.cos(y[..., 2])
+        dy[..., 2] = omega
+        return dy
+
+@pytest.fixture
+def fixture_sys_a():
+    params = {'optmizer': {'lowBound': [0.1 , 0.1],
+                            'upBound': [5.0,  0.5],
+                            'maxVelocity':  2,
+                            'minVelocity': -2,
+                            'nPop': 10,
+                            'nVar': 2,
+                            'social_weight': 2.0,
+                            'cognitive_weight': 1.0,
+                            'w': 0.9,
+                            'beta': 0.1,
+                            'w_damping': 0.999,
+                            'escape_min_vel_percent': 0.0005,
+                           'escape_min_error': 2e-3,
+                           'seed': 42},
+                'dyn_system': {'model_path': '',
+                                'external': None,
+                                'state_mask' : [True, False, False],
+                               'loss': 'rmse',
+                                'x0': [0., 0., 0.],
+                                't': [0,20,200]
+                                }
+                }
+    return params
+
+def pso(params):
+    f_fit = EqSystem(params)
+    f_fit.y = f_fit.simulation(np.array([1., 0.385]))
+    return PSO(f_fit, params)
+
+def test_max_evaluations(fixture_sys_a):
+    result = pso(fixture_sys_a).optimize(max_evaluations=55)
+    assert result.reason == 'max_evaluations'
+    assert result.evaluations == 50
+    assert result.iterations == 5
+    assert len(result.history) == 5
+
+@pytest.mark.parametrize('budget', [55, 100, 137])
+def test_max_evaluations_with_screening_and_refine(fixture_sys_a, budget):
+    fixture_sys_a['optmizer']['refine'] = {'stagnation': 1}
+    fixture_sys_a['dyn_system']['fidelity'] = {'levels': [{'stride': 4}], 'promote': 0.5}
+    optimizer = pso(fixture_sys_a)
+    result = optimizer.optimize(max_evaluations=budget, adaptive={'collapse': 1.})
+    assert result.reason == 'max_evaluations'
+    assert budget - 2 * 15 < result.evaluations <= budget
+
+def test_cost_tol(fixture_sys_a):
+    optimizer = pso(fixture_sys_a)
+    result = optimizer.optimize(max_iterations=200, cost_tol=0.05)
+    assert result.reason == 'cost_tol'
+    assert result.cost <= 0.05
+    assert np.array_equal(result.position, optimizer.pbg_position)
+
+def test_stagnation(fixture_sys_a):
+    result = pso(fixture_sys_a).optimize(max_iterations=500, stagnation=5, stagnation_tol=1e-3)
+    assert result.reason == 'stagnation'
+    history = result.history
+    assert history[-6] - history[-1] <= 1e-3 * history[-6]
+    assert result.iterations < 500
+
+def test_max_time_and_iterations(fixture_sys_a):
+    assert pso(fixture_sys_a).optimize(max_iterations=3).reason == 'max_iterations'
+    result = pso(fixture_sys_a).optimize(max_time=0.)
+    assert result.reason == 'max_time'
+    assert result.iterations == 0
+
+def test_resize(fixture_sys_a):
+    optimizer = pso(fixture_sys_a)
+    optimizer.run()
+    best = optimizer.pb_cost_[:, 0].min()
+    optimizer.resize(4)
+    assert optimizer.nPop == 4 and optimizer.pb_cost_.shape == (4, 1)
+    assert optimizer.pb_cost_[:, 0].min() == best
+    optimizer.resize(12)
+    assert optimizer.p_position_.shape == (12, 2)
+    assert optimizer.n_evaluations == 28
+    assert np.isfinite(optimizer.pb_cost_).all()
+    optimizer.run()
+    assert optimizer.p_cost_.shape == (12, 1)
+
+def test_adaptive_shrinks_collapsed_swarm(fixture_sys_a):
+    optimizer = pso(fixture_sys_a)
+    result = optimizer.optimize(max_iterations=100, adaptive={'min': 4, 'collapse': 0.05})
+    assert optimizer.nPop < 10
+    assert result.evaluations == optimizer.n_evaluations - 10
+
+def test_adaptive_grows_on_escape(fixture_sys_a):
+    fixture_sys_a['optmizer']['escape_min_vel_percent'] = 1.0
+    optimizer = pso(fixture_sys_a)
+    optimizer.optimize(max_iterations=2, adaptive={'max': 15, 'grow': 1.2})
+    assert optimizer.nPop == 15
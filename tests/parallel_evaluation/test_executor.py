@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+from nisi import PSO, Model
+from nisi.core.executor import Executor
+
+class EqSystem(Model):
+    def __init__(self, params=None):
+        super().__init__(params)
+        self._params = params
+
+    def model(self, t, y, *args):
+        k = self.unknown_const
+        alpha = 0.5
+        beta  = 1
+        delta = -1
+        omega = k[..., 0]
+        F     = k[..., 1]
+        dy = np.zeros(np.shape(y))
+        dy[..., 0] = y[..., 1]
+        dy[..., 1] = -alpha*y[..., 1] -delta*y[..., 0] -beta*y[..., 0]**3 + F*np.cos(y[..., 2])
+        dy[..., 2] = omega
+        return dy
+
+class VecEqSystem(EqSystem):
+    vectorized = True
+
+class InplaceVecEqSystem(VecEqSystem):
+    inplace = True
+
+    def model(self, t, y, *args, out=None):
+        dy = super().model(t, y, *args)
+        if out is None:
+            return dy
+        out[...] = dy
+        return out
+
+@pytest.fixture
+def fixture_sys_a():
+    params = {'optmizer': {'lowBound': [0.1 , 0.1],
+                            'upBound': [5.0,  0.5],
+                            'maxVelocity':  2,
+                            'minVelocity': -2,
+                            'nPop': 10,
+                            'nVar': 2,
+                            'social_weight': 2.0,
+                            'cognitive_weight': 1.0,
+                            'w': 0.9,
+                            'beta': 0.1,
+                            'w_damping': 0.999,
+                            'escape_min_vel_percent': 0.0005,
+                           'escape_min_error': 2e-3},
+                'dyn_system': {'model_path': '',
+                                'external': None,
+                                'state_mask' : [True, False, False],
+                               'loss': 'rmse',
+                                'x0': [0., 0., 0.],
+                                't': [0,20,200]
+                                }
+                }
+    return params
+
+@pytest.mark.parametrize('system', [EqSystem, VecEqSystem])
+@pytest.mark.parametrize('kind', ['thread', 'process'])
+def test_executor_matches_serial(fixture_sys_a, system, kind):
+    f_fit = system(fixture_sys_a)
+    f_fit.y = f_fit.simulation(np.array([1., 0.385]))
+    positions = np.random.rand(7, 2) * [4.9, 0.4] + 0.1
+    cost, y_hat, _ = Executor(f_fit).evaluate(positions)
+    executor = Executor(f_fit, kind, n_workers=3)
+    try:
+        cost_p, y_hat_p, _ = executor.evaluate(positions)
+    finally:
+        executor.shutdown()
+    assert np.allclose(cost, cost_p)
+    if kind == 'process':
+        # process workers only send back the final states
+        y_hat = [y[-1] for y in y_hat]
+    assert all(np.allclose(a, b) for a, b in zip(y_hat, y_hat_p))
+
+def test_thread_executor_copies_inplace_chunks(fixture_sys_a):
+    f_fit = InplaceVecEqSystem(fixture_sys_a)
+    f_fit.y = f_fit.simulation(np.array([1., 0.385]))
+    positions = np.random.rand(16, 2) * [4.9, 0.4] + 0.1
+    serial = Executor(VecEqSystem(fixture_sys_a))
+    serial.fitness.y = f_fit.y
+    executor = Executor(f_fit, 'thread', n_workers=4)
+    try:
+        # equal chunks reuse each worker's buffers on the next call
+        results = [executor.evaluate(positions[:8]), executor.evaluate(positions[8:])]
+    finally:
+        executor.shutdown()
+    for (cost_p, y_hat_p, _), chunk in zip(results, (positions[:8], positions[8:])):
+        cost, y_hat, _ = serial.evaluate(chunk)
+        assert np.allclose(cost, cost_p)
+        assert all(np.allclose(a, b) for a, b in zip(y_hat, y_hat_p))
+
+def test_pso_process_executor(fixture_sys_a):
+    fixture_sys_a['optmizer']['executor'] = 'process'
+    fixture_sys_a['optmizer']['n_workers'] = 2
+    f_fit = EqSystem(fixture_sys_a)
+    f_fit.y = f_fit.simulation(np.array([1., 0.385]))
+    pso = PSO(f_fit, fixture_sys_a)
+    try:
+        for i in range(3):
+            pso.run()
+    finally:
+        pso.close()
+    assert pso.pbg_cost <= pso.pb_cost_.min()
+    assert np.allclose(pso.pbg_y_hat, f_fit.simulation(pso.pbg_position))
+    assert any(state is not None for state in pso._pb_state)
+    assert all(np.allclose(state, f_fit.simulation(k)[-1])
+               for state, k in zip(pso._pb_state, pso.pb_position_) if state is not None)
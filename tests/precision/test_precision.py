@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+from nisi import PSO, Model, MultiExperiment, MultipleShooting
+
+class EqSystem(Model):
+    vectorized = True
+
+    def __init__(self, params=None):
+        super().__init__(params)
+        self._params = params
+
+    def model(self, t, y, *args):
+        k = self.unknown_const
+        alpha = 0.5
+        beta  = 1
+        delta = -1
+        omega = k[..., 0]
+        F     = k[..., 1]
+        dy = np.zeros(np.shape(y))
+        dy[..., 0] = y[..., 1]
+        dy[..., 1] = -alpha*y[..., 1] -delta*y[..., 0] -beta*y[..., 0]**3 + F*np.cos(y[..., 2])
+        dy[..., 2] = omega
+        return dy
+
+@pytest.fixture
+def fixture_sys_a():
+    params = {'optmizer': {'lowBound': [0.1 , 0.1],
+                            'upBound': [5.0,  0.5],
+                            'maxVelocity':  2,
+                            'minVelocity': -2,
+                            'nPop': 10,
+                            'nVar': 2,
+                            'social_weight': 2.0,
+                            'cognitive_weight': 1.0,
+                            'w': 0.9,
+                            'beta': 0.1,
+                            'w_damping': 0.999,
+                            'escape_min_vel_percent': 0.0005,
+                           'escape_min_error': 2e-3,
+                           'seed': 42},
+                'dyn_system': {'model_path': '',
+                                'external': None,
+                                'state_mask' : [True, False, False],
+                               'loss': 'rmse',
+                                'x0': [0., 0., 0.],
+                                't': [0,20,200]
+                                }
+                }
+    return params
+
+class InplaceSystem(EqSystem):
+    inplace = True
+
+    def model(self, t, y, *args, out=None):
+        dy = super().model(t, y, *args)
+        if out is None:
+            return dy
+        out[...] = dy
+        return out
+
+def single(params):
+    params['dyn_system']['dtype'] = 'float32'
+    return params
+
+@pytest.mark.parametrize('system', [EqSystem, InplaceSystem])
+def test_float32_close_to_float64(fixture_sys_a, system):
+    f64 = system(fixture_sys_a)
+    f64.y = f64.simulation(np.array([1., 0.385]))
+    f32 = system(single(fixture_sys_a))
+    f32.y = f64.y
+    k = np.array([[1.2, 0.3], [0.8, 0.4]])
+    loss, _, y_hat = f32.evaluate_batch(k)
+    assert y_hat.dtype == np.float32
+    assert np.allclose(loss, f64.evaluate_batch(k)[0], rtol=1e-4)
+    assert f32.exact(k[0]) == f64.evaluate(k[0])[0]
+    assert f32.simulation(k[0]).dtype == np.float64
+
+def test_global_best_is_verified(fixture_sys_a):
+    f64 = EqSystem(fixture_sys_a)
+    y = f64.simulation(np.array([1., 0.385]))
+    f_fit = EqSystem(single(fixture_sys_a))
+    f_fit.y = y
+    f64.y = y
+    pso = PSO(f_fit, fixture_sys_a)
+    for i in range(5):
+        pso.run()
+        assert pso.pbg_cost == f64.evaluate(pso.pbg_position)[0]
+    assert pso.n_evaluations > 6 * pso.nPop
+
+def test_wrappers_follow_model_precision(fixture_sys_a):
+    f64 = EqSystem(fixture_sys_a)
+    y = f64.simulation(np.array([1., 0.385]))
+    f32 = EqSystem(single(fixture_sys_a))
+    f64.y = f32.y = y
+    k = np.array([1.2, 0.3])
+    for wrap in (lambda m: MultiExperiment([m]), lambda m: MultipleShooting(m, 1, 2)):
+        reduced, full = wrap(f32), wrap(f64)
+        assert reduced.dtype == np.float32 and full.dtype == np.float64
+        assert np.asarray(reduced.evaluate_batch(k[None, :])[2][0]).dtype == np.float32
+        assert reduced.exact(k) == full.evaluate(k)[0]
+        assert f32.dtype == np.float32
+
+def test_multi_experiment_global_best_is_verified(fixture_sys_a):
+    f64 = EqSystem(fixture_sys_a)
+    y = f64.simulation(np.array([1., 0.385]))
+    f_fit = EqSystem(single(fixture_sys_a))
+    f_fit.y = f64.y = y
+    pso = PSO(MultiExperiment([f_fit]), fixture_sys_a)
+    for i in range(3):
+        pso.run()
+        assert np.isclose(pso.pbg_cost, MultiExperiment([f64]).evaluate(pso.pbg_position)[0],
+                          rtol=1e-12, atol=0)
@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+from nisi import PSO, Model, MultiExperiment, MultipleShooting
+from nisi.core.refine import levenberg_marquardt
+
+class EqSystem(Model):
+    vectorized = True
+
+    def __init__(self, params=None):
+        super().__init__(params)
+        self._params = params
+
+    def model(self, t, y, *args):
+        k = self.unknown_const
+        alpha = 0.5
+        beta  = 1
+        delta = -1
+        omega = k[..., 0]
+        F     = k[..., 1]
+        dy = np.zeros(np.shape(y))
+        dy[..., 0] = y[..., 1]
+        dy[..., 1] = -alpha*y[..., 1] -delta*y[..., 0] -beta*y[..., 0]**3 + F*np.cos(y[..., 2])
+        dy[..., 2] = omega
+        return dy
+
+@pytest.fixture
+def fixture_sys_a():
+    params = {'optmizer': {'lowBound': [0.1 , 0.1],
+                            'upBound': [5.0,  0.5],
+                            'maxVelocity':  2,
+                            'minVelocity': -2,
+                            'nPop': 10,
+                            'nVar': 2,
+                            'social_weight': 2.0,
+                            'cognitive_weight': 1.0,
+                            'w': 0.9,
+                            'beta': 0.1,
+                            'w_damping': 0.999,
+                            'escape_min_vel_percent': 0.0005,
+                           'escape_min_error': 2e-3,
+                           'seed': 42},
+                'dyn_system': {'model_path': '',
+                                'external': None,
+                                'state_mask' : [True, False, False],
+                               'loss': 'rmse',
+                                'x0': [0., 0., 0.],
+                                't': [0,20,200]
+                                }
+                }
+    return params
+
+def test_levenberg_marquardt_rosenbrock():
+    def residuals(k):
+        return np.stack([10 * (k[:, 1] - k[:, 0]**2), 1 - k[:, 0]], axis=1)
+    k, sse, evaluations, iterations = levenberg_marquardt(
+        residuals, [-1.2, 1.], [-5., -5.], [5., 5.], max_iterations=100)
+    assert np.allclose(k, [1., 1.], atol=1e-6)
+    assert sse < 1e-12
+
+def test_levenberg_marquardt_respects_bounds():
+    def residuals(k):
+        return k - 3.
+    k, _, _, _ = levenberg_marquardt(residuals, [0., 0.], [-1., -1.], [1., 2.])
+    assert np.allclose(k, [1., 2.])
+
+def test_refine_global_best(fixture_sys_a):
+    f_fit = EqSystem(fixture_sys_a)
+    f_fit.y = f_fit.simulation(np.array([1., 0.385]))
+    pso = PSO(f_fit, fixture_sys_a)
+    pso.inject(np.array([[1.02, 0.37]]))
+    cost = pso.pbg_cost
+    evaluations = pso.n_evaluations
+    assert pso.refine()
+    assert pso.pbg_cost < 1e-8 < cost
+    assert np.allclose(pso.pbg_position, [1., 0.385], atol=1e-6)
+    assert pso.n_evaluations - evaluations == pso.stats['refine_evaluations'] < 100
+    assert np.allclose(pso.pbg_y_hat, f_fit.simulation(pso.pbg_position))
+
+def test_refine_on_stagnation(fixture_sys_a):
+    fixture_sys_a['optmizer']['refine'] = {'stagnation': 3, 'max_iterations': 30}
+    f_fit = EqSystem(fixture_sys_a)
+    f_fit.y = f_fit.simulation(np.array([1., 0.385]))
+    pso = PSO(f_fit, fixture_sys_a)
+    refined = []
+    for i in range(40):
+        pso.run()
+        if 'refine_evaluations' in pso.stats:
+            refined.append(i)
+    assert refined
+    assert pso.pbg_cost < 1e-6
+
+def test_wrapper_residuals_match_loss(fixture_sys_a):
+    fixture_sys_a['dyn_system']['loss'] = 'mse'
+    f_a = EqSystem(fixture_sys_a)
+    f_a.y = f_a.simulation(np.array([1., 0.385]))
+    fixture_sys_a['dyn_system']['x0'] = [0.5, 0., 0.]
+    f_b = EqSystem(fixture_sys_a)
+    f_b.y = f_b.simulation(np.array([1., 0.385]))
+    experiments = MultiExperiment([f_a, f_b], weights=[1., 3.])
+    k = np.array([[1.1, 0.3], [0.9, 0.4]])
+    r = experiments.residuals(k)
+    assert np.allclose((r**2).sum(1), experiments.evaluate_batch(k)[0])
+    shooting = MultipleShooting(f_a, segments=3, n_unknown=2, penalty=0.5)
+    k = np.hstack([k, np.random.default_rng(0).random((2, shooting.n_extra))])
+    r = shooting.residuals(k)
+    assert np.allclose((r**2).sum(1), shooting.evaluate_batch(k)[0])
+
+def test_refine_multi_experiment(fixture_sys_a):
+    f_a = EqSystem(fixture_sys_a)
+    f_a.y = f_a.simulation(np.array([1., 0.385]))
+    fixture_sys_a['dyn_system']['x0'] = [0.5, 0., 0.]
+    f_b = EqSystem(fixture_sys_a)
+    f_b.y = f_b.simulation(np.array([1., 0.385]))
+    pso = PSO(MultiExperiment([f_a, f_b]), fixture_sys_a)
+    pso.inject(np.array([[1.02, 0.37]]))
+    assert pso.refine()
+    assert pso.pbg_cost < 1e-8
+    assert np.allclose(pso.pbg_position, [1., 0.385], atol=1e-6)
+
+def test_refine_needs_residuals(fixture_sys_a):
+    class Fitness:
+        y = None
+    fixture_sys_a['optmizer']['refine'] = {'stagnation': 3}
+    with pytest.raises(Exception, match='residuals'):
+        PSO(Fitness(), fixture_sys_a)
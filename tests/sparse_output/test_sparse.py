@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+from nisi import PSO, Model
+
+class EqSystem(Model):
+    vectorized = True
+
+    def __init__(self, params=None):
+        super().__init__(params)
+        self._params = params
+
+    def model(self, t, y, *args):
+        k = self.unknown_const
+        alpha = 0.5
+        beta  = 1
+        delta = -1
+        omega = k[..., 0]
+        F     = k[..., 1]
+        dy = np.zeros(np.shape(y))
+        dy[..., 0] = y[..., 1]
+        dy[..., 1] = -alpha*y[..., 1] -delta*y[..., 0] -beta*y[..., 0]**3 + F*np.cos(y[..., 2])
+        dy[..., 2] = omega
+        return dy
+
+@pytest.fixture
+def fixture_sys_a():
+    params = {'optmizer': {'lowBound': [0.1 , 0.1],
+                            'upBound': [5.0,  0.5],
+                            'maxVelocity':  2,
+                            'minVelocity': -2,
+                            'nPop': 10,
+                            'nVar': 2,
+                            'social_weight': 2.0,
+                            'cognitive_weight': 1.0,
+                            'w': 0.9,
+                            'beta': 0.1,
+                            'w_damping': 0.999,
+                            'escape_min_vel_percent': 0.0005,
+                           'escape_min_error': 2e-3,
+                           'seed': 42},
+                'dyn_system': {'model_path': '',
+                                'external': None,
+                                'state_mask' : [True, False, False],
+                               'loss': 'rmse',
+                                'x0': [0., 0., 0.],
+                                't': [0,20,200]
+                                }
+                }
+    return params
+
+class InplaceSystem(EqSystem):
+    inplace = True
+
+    def model(self, t, y, *args, out=None):
+        dy = super().model(t, y, *args)
+        if out is None:
+            return dy
+        out[...] = dy
+        return out
+
+def sparse(params, decimate=1):
+    params['dyn_system'].update(sparse_output=True, decimate=decimate)
+    return params
+
+@pytest.mark.parametrize('system', [EqSystem, InplaceSystem])
+def test_sparse_matches_full(fixture_sys_a, system):
+    f_full = system(fixture_sys_a)
+    f_full.y = f_full.simulation(np.array([1., 0.385]))
+    f_sparse = system(sparse(fixture_sys_a))
+    f_sparse.y = f_full.y
+    k = np.array([[1.2, 0.3], [0.8, 0.4]])
+    loss, _, y_full = f_full.evaluate_batch(k)
+    loss_sparse, _, y_sparse = f_sparse.evaluate_batch(k)
+    assert y_sparse.shape == (2, 200, 1)
+    assert np.allclose(loss_sparse, loss)
+    assert np.allclose(y_sparse, y_full[..., f_full.state_mask])
+    assert np.isclose(f_sparse.evaluate(k[0])[0], loss[0])
+
+def test_decimated_loss(fixture_sys_a):
+    f_full = EqSystem(fixture_sys_a)
+    f_full.y = f_full.simulation(np.array([1., 0.385]))
+    f_sparse = EqSystem(sparse(fixture_sys_a, decimate=7))
+    f_sparse.y = f_full.y
+    k = np.array([1.2, 0.3])
+    loss, _, y_hat = f_sparse.evaluate(k)
+    full = f_full.simulation(k)
+    assert y_hat.shape == (len(range(0, 200, 7)), 1)
+    assert np.allclose(y_hat[:, 0], full[::7, 0])
+    assert np.isclose(loss, f_full.rmse(f_full.y[::7, :1], full[::7, :1]))
+
+def test_early_abandon_sparse(fixture_sys_a):
+    f_full = EqSystem(fixture_sys_a)
+    f_full.y = f_full.simulation(np.array([1., 0.385]))
+    f_sparse = EqSystem(sparse(fixture_sys_a, decimate=3))
+    f_sparse.y = f_full.y
+    k = np.array([[1.2, 0.3], [1.0, 0.38]])
+    loss = f_sparse.evaluate_batch(k)[0]
+    bounded, _, y_hat = f_sparse.evaluate_batch(k, threshold=np.array([np.inf, loss[1] * 1.01]))
+    assert np.allclose(bounded, loss)
+    assert y_hat.shape == (2, len(range(0, 200, 3)), 1)
+    bounded = f_sparse.evaluate_batch(k, threshold=np.array([loss[0] / 2, np.inf]))[0]
+    assert np.isinf(bounded[0]) and np.isclose(bounded[1], loss[1])
+
+def test_pso_keeps_full_global_best(fixture_sys_a):
+    f_full = EqSystem(fixture_sys_a)
+    y = f_full.simulation(np.array([1., 0.385]))
+    f_fit = EqSystem(sparse(fixture_sys_a))
+    f_fit.y = y
+    pso = PSO(f_fit, fixture_sys_a)
+    pso.run()
+    assert pso.pbg_y_hat.shape == y.shape
+    assert np.allclose(pso.pbg_y_hat, f_full.simulation(pso.pbg_position))
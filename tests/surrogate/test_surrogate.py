@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from nisi import PSO, Model
+from nisi.core.surrogate import Surrogate
+
+class EqSystem(Model):
+    vectorized = True
+
+    def __init__(self, params=None):
+        super().__init__(params)
+        self._params = params
+
+    def model(self, t, y, *args):
+        k = self.unknown_const
+        alpha = 0.5
+        beta  = 1
+        delta = -1
+        omega = k[..., 0]
+        F     = k[..., 1]
+        dy = np.zeros(np.shape(y))
+        dy[..., 0] = y[..., 1]
+        dy[..., 1] = -alpha*y[..., 1] -delta*y[..., 0] -beta*y[..., 0]**3 + F*np.cos(y[..., 2])
+        dy[..., 2] = omega
+        return dy
+
+@pytest.fixture
+def fixture_sys_a():
+    params = {'optmizer': {'lowBound': [0.1 , 0.1],
+                            'upBound': [5.0,  0.5],
+                            'maxVelocity':  2,
+                            'minVelocity': -2,
+                            'nPop': 10,
+                            'nVar': 2,
+                            'social_weight': 2.0,
+                            'cognitive_weight': 1.0,
+                            'w': 0.9,
+                            'beta': 0.1,
+                            'w_damping': 0.999,
+                            'escape_min_vel_percent': 0.0005,
+                           'escape_min_error': 2e-3,
+                           'seed': 42},
+                'dyn_system': {'model_path': '',
+                                'external': None,
+                                'state_mask' : [True, False, False],
+                               'loss': 'rmse',
+                                'x0': [0., 0., 0.],
+                                't': [0,20,200]
+                                }
+                }
+    return params
+
+@pytest.mark.parametrize('method', ['knn', 'rbf'])
+def test_surrogate_interpolates_archive(method):
+    rng = np.random.default_rng(0)
+    x = rng.random((200, 2)) * [4.9, 0.4] + [0.1, 0.1]
+    cost = ((x - [1., 0.385]) ** 2).sum(1)
+    surrogate = Surrogate([0.1, 0.1], [5.0, 0.5], method=method)
+    surrogate.add(x, cost)
+    assert np.allclose(surrogate.predict(x[:5]), cost[:5], rtol=1e-3, atol=1e-6)
+    new = rng.random((50, 2)) * [4.9, 0.4] + [0.1, 0.1]
+    truth = ((new - [1., 0.385]) ** 2).sum(1)
+    assert np.corrcoef(surrogate.predict(new), truth)[0, 1] > 0.9
+
+def test_surrogate_ignores_non_finite():
+    surrogate = Surrogate([0., 0.], [1., 1.])
+    surrogate.add(np.array([[0.1, 0.1], [0.2, 0.2]]), np.array([1., np.inf]))
+    assert len(surrogate) == 1
+
+def test_pso_saves_evaluations(fixture_sys_a):
+    fixture_sys_a['optmizer']['surrogate'] = {'select': 0.3, 'explore': 0.1, 'min_archive': 10}
+    f_fit = EqSystem(fixture_sys_a)
+    f_fit.y = f_fit.simulation(np.array([1., 0.385]))
+    pso = PSO(f_fit, fixture_sys_a)
+    saved = 0
+    for i in range(10):
+        pbg_cost = pso.pbg_cost
+        pso.run()
+        assert pso.pbg_cost <= pbg_cost
+        assert pso.stats['evaluations'] + pso.stats['surrogate_saved'] == pso.nPop
+        saved += pso.stats['surrogate_saved']
+    assert saved > 0
+    assert np.isfinite(pso.stats['surrogate_error'])
+    assert pso.n_evaluations == 10 * pso.nPop + 10 - saved
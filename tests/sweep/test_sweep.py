@@ -0,0 +1,122 @@
+import numpy as np
+import pytest
+from nisi import PSO, Model, Sweep
+
+class EqSystem(Model):
+    vectorized = True
+
+    def __init__(self, params=None):
+        super().__init__(params)
+        self._params = params
+
+    def model(self, t, y, *args):
+        k = self.unknown_const
+        alpha = 0.5
+        beta  = 1
+        delta = -1
+        omega = k[..., 0]
+        F     = k[..., 1]
+        dy = np.zeros(np.shape(y))
+        dy[..., 0] = y[..., 1]
+        dy[..., 1] = -alpha*y[..., 1] -delta*y[..., 0] -beta*y[..., 0]**3 + F*np.cos(y[..., 2])
+        dy[..., 2] = omega
+        return dy
+
+@pytest.fixture
+def fixture_sys_a():
+    params = {'optmizer': {'lowBound': [0.1 , 0.1],
+                            'upBound': [5.0,  0.5],
+                            'maxVelocity':  2,
+                            'minVelocity': -2,
+                            'nPop': 10,
+                            'nVar': 2,
+                            'social_weight': 2.0,
+                            'cognitive_weight': 1.0,
+                            'w': 0.9,
+                            'beta': 0.1,
+                            'w_damping': 0.999,
+                            'escape_min_vel_percent': 0.0005,
+                           'escape_min_error': 2e-3,
+                           'seed': 42},
+                'dyn_system': {'model_path': '',
+                                'external': None,
+                                'state_mask' : [True, False, False],
+                               'loss': 'rmse',
+                                'x0': [0., 0., 0.],
+                                't': [0,20,200]
+                                }
+                }
+    return params
+
+def fitness(params):
+    f_fit = EqSystem(params)
+    f_fit.y = f_fit.simulation(np.array([1., 0.385]))
+    return f_fit
+
+def test_grid_sweep(fixture_sys_a, tmp_path):
+    f_fit = fitness(fixture_sys_a)
+    omega, F = np.linspace(0.5, 1.5, 11), np.linspace(0.2, 0.5, 7)
+    sweep = Sweep(f_fit, tmp_path, grid=[omega, F], chunksize=10)
+    cost = sweep.run()
+    assert cost.shape == (11, 7)
+    assert np.isclose(cost[3, 2], f_fit.evaluate(np.array([omega[3], F[2]]))[0])
+    positions, best = sweep.best(3)
+    assert np.allclose(positions[0], [1., 0.35])
+    assert np.all(np.diff(best) >= 0)
+    sweep.close()
+
+def test_grid_sweep_refuses_other_axes(fixture_sys_a, tmp_path):
+    f_fit = fitness(fixture_sys_a)
+    omega, F = np.linspace(0.5, 1.5, 11), np.linspace(0.2, 0.5, 7)
+    Sweep(f_fit, tmp_path, grid=[omega, F]).close()
+    Sweep(f_fit, tmp_path, grid=[omega, F]).close()
+    with pytest.raises(Exception, match='axes differ'):
+        # same shape, other values
+        Sweep(f_fit, tmp_path, grid=[omega + 1., F])
+
+def test_sweep_refuses_other_lhs_or_fitness(fixture_sys_a, tmp_path):
+    f_fit = fitness(fixture_sys_a)
+    lhs = {'n': 20, 'lowBound': [0.1, 0.1], 'upBound': [5.0, 0.5], 'seed': 3}
+    Sweep(f_fit, tmp_path, lhs=lhs).close()
+    Sweep(f_fit, tmp_path, lhs=dict(lhs, lowBound=np.array([0.1, 0.1]))).close()
+    with pytest.raises(Exception, match='lhs differ'):
+        Sweep(f_fit, tmp_path, lhs=dict(lhs, upBound=[2.0, 0.5]))
+    with pytest.raises(Exception, match='lhs differ'):
+        Sweep(f_fit, tmp_path, lhs=dict(lhs, seed=4))
+    other = fitness(fixture_sys_a)
+    other.y = other.simulation(np.array([1.2, 0.3]))
+    with pytest.raises(Exception, match='fingerprint differ'):
+        Sweep(other, tmp_path, lhs=lhs)
+
+def test_lhs_sweep_resumes(fixture_sys_a, tmp_path):
+    f_fit = fitness(fixture_sys_a)
+    lhs = {'n': 25, 'lowBound': [0.1, 0.1], 'upBound': [5.0, 0.5], 'seed': 3}
+    sweep = Sweep(f_fit, tmp_path, lhs=lhs, chunksize=10)
+    strata = np.floor((sweep.points(0, 25) - [0.1, 0.1]) / [4.9 / 25, 0.4 / 25])
+    assert all(len(np.unique(s)) == 25 for s in strata.T)
+    seen = []
+    try:
+        sweep.run(progress=lambda done, total: seen.append(done) or (done < 2 or 1 / 0))
+    except ZeroDivisionError:
+        pass
+    sweep.close()
+    assert seen == [1, 2]
+    sweep = Sweep(f_fit, tmp_path, lhs=lhs, chunksize=10)
+    assert np.isnan(sweep.cost[20:]).all() and not np.isnan(sweep.cost[:20]).any()
+    calls = []
+    cost = sweep.run(progress=lambda done, total: calls.append(done))
+    assert calls == [3]
+    expected = [f_fit.evaluate(p)[0] for p in sweep.points(0, 25)]
+    assert np.allclose(cost, expected)
+    sweep.close()
+
+def test_seed_pso(fixture_sys_a, tmp_path):
+    f_fit = fitness(fixture_sys_a)
+    sweep = Sweep(f_fit, tmp_path, grid=[np.linspace(0.5, 1.5, 11), np.linspace(0.2, 0.5, 7)])
+    sweep.run()
+    pso = PSO(f_fit, fixture_sys_a)
+    sweep.seed(pso, 3)
+    positions, cost = sweep.best(3)
+    assert pso.pbg_cost <= cost[0]
+    assert any(np.allclose(p, positions[0]) for p in pso.pb_position_)
+    sweep.close()